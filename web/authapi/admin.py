@@ -5,15 +5,17 @@ from .models import EmailVerificationToken, PasswordResetToken
 
 @admin.register(PasswordResetToken)
 class PasswordResetTokenAdmin(admin.ModelAdmin):
-    list_display = ["user", "created_at", "used"]
+    list_display = ["user", "created_at", "expires_at", "used"]
     list_filter = ["used", "created_at"]
     search_fields = ["user__email"]
-    readonly_fields = ["token", "created_at"]
+    readonly_fields = ["token_hash", "created_at", "expires_at"]
+    list_select_related = ["user"]
 
 
 @admin.register(EmailVerificationToken)
 class EmailVerificationTokenAdmin(admin.ModelAdmin):
-    list_display = ["user", "created_at", "used"]
+    list_display = ["user", "created_at", "expires_at", "used"]
     list_filter = ["used", "created_at"]
     search_fields = ["user__email"]
-    readonly_fields = ["token", "created_at"]
+    readonly_fields = ["token_hash", "created_at", "expires_at"]
+    list_select_related = ["user"]
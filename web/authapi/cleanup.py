@@ -0,0 +1,96 @@
+"""
+Chunked deletion of accounts that never verified their email.
+
+Users are walked in `(created_at, id)` order and deleted a batch at a time,
+each batch in its own short transaction, so a signup spam wave never turns
+into one long-running delete holding locks on the users table. Token rows have
+no signals or further cascades, so Django's collector removes them with a
+single `DELETE ... WHERE user_id IN (...)` per batch without loading them.
+The users' cached session and profile state is cleared with one
+`delete_many` per batch instead of one call per user from the post_delete
+receiver.
+
+The keyset cursor is stored in Redis after every batch; a run that hits its
+time budget stops there and the next run resumes from it.
+"""
+
+import time
+
+import structlog
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from metrics.collectors import track_cleanup_batch
+
+from .signals import bulk_user_changes, cached_user_state_keys
+
+logger = structlog.get_logger(__name__)
+
+CURSOR_KEY = "authapi:cleanup-unverified-cursor"
+CURSOR_TTL = 60 * 60 * 24
+
+UNVERIFIED_ACCOUNT_LIFETIME = timezone.timedelta(days=7)
+
+
+def delete_unverified_accounts(batch_size=None, time_budget=None):
+    """
+    Delete unverified accounts older than 7 days, a batch at a time
+
+    Args:
+        batch_size: Users deleted per transaction
+        time_budget: Seconds after which to stop and leave the cursor in place
+
+    Returns:
+        tuple: (users deleted, whether every eligible user was processed)
+    """
+    batch_size = batch_size or settings.AUTH_CLEANUP_BATCH_SIZE
+    time_budget = time_budget or settings.AUTH_CLEANUP_TIME_BUDGET
+    User = get_user_model()
+
+    cutoff = timezone.now() - UNVERIFIED_ACCOUNT_LIFETIME
+    candidates = User.objects.filter(
+        email_verified=False, created_at__lt=cutoff
+    ).order_by("created_at", "pk")
+
+    cursor = cache.get(CURSOR_KEY)
+    if cursor:
+        logger.info(f"Resuming unverified account cleanup after {cursor}")
+
+    started = time.monotonic()
+    deleted = 0
+    while True:
+        batch = candidates
+        if cursor:
+            created_at, pk = cursor
+            batch = batch.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            )
+        rows = list(batch.values_list("pk", "created_at")[:batch_size])
+        if not rows:
+            cache.delete(CURSOR_KEY)
+            return deleted, True
+
+        batch_started = time.monotonic()
+        pks = [pk for pk, _ in rows]
+        with bulk_user_changes(), transaction.atomic():
+            User.objects.filter(pk__in=pks).delete()
+        cache.delete_many(cached_user_state_keys(pks))
+        track_cleanup_batch(
+            "unverified_accounts", len(rows), time.monotonic() - batch_started
+        )
+
+        deleted += len(rows)
+        cursor = (rows[-1][1], rows[-1][0])
+        cache.set(CURSOR_KEY, cursor, timeout=CURSOR_TTL)
+
+        if time.monotonic() - started >= time_budget:
+            break
+
+    logger.info(
+        f"Unverified account cleanup stopped after {deleted} users "
+        f"({time_budget}s budget)"
+    )
+    return deleted, False
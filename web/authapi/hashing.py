@@ -0,0 +1,81 @@
+"""
+Password hashing in a bounded process pool.
+
+PBKDF2 at Django's iteration count costs tens of milliseconds of CPU per call.
+`PooledPBKDF2PasswordHasher` derives keys in a per-process pool sized to the
+machine's cores, so a burst of logins queues for a fixed number of cores
+instead of competing with every other request for CPU.
+
+Hashes are byte-for-byte those of Django's PBKDF2PasswordHasher and use the
+same algorithm name, so existing passwords verify without a rehash.
+PASSWORD_HASHING_WORKERS=0 derives keys inline in the calling thread. If a
+pool worker dies the pool is replaced and the key derived again.
+"""
+
+import base64
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process's hashing pool, or None when hashing inline"""
+    global _executor
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # Web and Celery processes are multi-threaded by the time the
+            # first password is hashed, so don't fork them
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+    return _executor
+
+
+def _replace_broken_executor(broken):
+    """Drop a pool whose worker died so the next call starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def _pbkdf2(password, salt, iterations, digest_name):
+    return hashlib.pbkdf2_hmac(digest_name, password, salt, iterations)
+
+
+def derive_key(password, salt, iterations, digest_name):
+    args = (password.encode(), salt.encode(), iterations, digest_name)
+    for attempt in range(2):
+        executor = get_executor()
+        if executor is None:
+            return _pbkdf2(*args)
+        try:
+            return executor.submit(_pbkdf2, *args).result()
+        except BrokenProcessPool:
+            _replace_broken_executor(executor)
+            if attempt:
+                raise
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Django's PBKDF2-SHA256 hasher, deriving keys in the hashing pool"""
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        iterations = iterations or self.iterations
+        hash = derive_key(password, salt, iterations, self.digest().name)
+        hash = base64.b64encode(hash).decode("ascii").strip()
+        return "%s$%d$%s$%s" % (self.algorithm, iterations, salt, hash)
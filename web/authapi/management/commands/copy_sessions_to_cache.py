@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy unexpired database sessions into the session cache so "
+        "SESSION_ENGINE can be switched to the cache backend without "
+        "logging users out"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of sessions to read per query",
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        now = timezone.now()
+        copied = 0
+
+        sessions = Session.objects.filter(expire_date__gt=now).iterator(
+            chunk_size=options["batch_size"]
+        )
+        for session in sessions:
+            store = SessionStore(session.session_key)
+            timeout = int((session.expire_date - now).total_seconds())
+            cache.set(store.cache_key, store.decode(session.session_data), timeout)
+            copied += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Copied {copied} sessions to cache"))
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.9 on 2026-10-17 21:05
+
+import hashlib
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+
+LIFETIMES = {
+    "PasswordResetToken": timedelta(hours=1),
+    "EmailVerificationToken": timedelta(days=7),
+}
+
+
+def hash_existing_tokens(apps, schema_editor):
+    for model_name, lifetime in LIFETIMES.items():
+        model = apps.get_model("authapi", model_name)
+        tokens = list(model.objects.only("token", "created_at"))
+        for token in tokens:
+            token.token_hash = hashlib.sha256(token.token.encode()).hexdigest()
+            token.expires_at = token.created_at + lifetime
+        model.objects.bulk_update(tokens, ["token_hash", "expires_at"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authapi", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="emailverificationtoken",
+            name="token_hash",
+            field=models.CharField(default="", max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="emailverificationtoken",
+            name="expires_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="passwordresettoken",
+            name="token_hash",
+            field=models.CharField(default="", max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="passwordresettoken",
+            name="expires_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="emailverificationtoken",
+            name="token",
+        ),
+        migrations.RemoveField(
+            model_name="passwordresettoken",
+            name="token",
+        ),
+        migrations.AddIndex(
+            model_name="emailverificationtoken",
+            index=models.Index(
+                condition=models.Q(("used", False)),
+                fields=["token_hash"],
+                name="authapi_verify_unused_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="emailverificationtoken",
+            index=models.Index(
+                fields=["expires_at"], name="authapi_verify_expires_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="passwordresettoken",
+            index=models.Index(
+                condition=models.Q(("used", False)),
+                fields=["token_hash"],
+                name="authapi_reset_unused_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="passwordresettoken",
+            index=models.Index(fields=["expires_at"], name="authapi_reset_expires_idx"),
+        ),
+    ]
@@ -1,59 +1,117 @@
+import hashlib
 import secrets
+from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 
 
-class PasswordResetToken(models.Model):
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name="password_reset_tokens",
-    )
-    token = models.CharField(max_length=64, unique=True)
+def hash_token(token):
+    """Tokens are stored as a SHA-256 digest; the plaintext only goes in emails."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SingleUseToken(models.Model):
+    """
+    Emailed single-use token, looked up by digest and consumed atomically
+
+    Subclasses set `lifetime` and add a `user` foreign key.
+    """
+
+    lifetime = None
+
+    token_hash = models.CharField(max_length=64)
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
     used = models.BooleanField(default=False)
 
+    class Meta:
+        abstract = True
+
     def is_valid(self):
-        """Token is valid for 1 hour and hasn't been used."""
-        if self.used:
-            return False
-        age = timezone.now() - self.created_at
-        return age.total_seconds() < 3600  # 1 hour
+        return not self.used and timezone.now() < self.expires_at
 
     @classmethod
     def create_for_user(cls, user):
-        """Create a new password reset token for a user."""
+        """Create a token for a user and return its plaintext."""
         token = secrets.token_urlsafe(32)
-        return cls.objects.create(user=user, token=token)
+        cls.objects.create(
+            user=user,
+            token_hash=hash_token(token),
+            expires_at=timezone.now() + cls.lifetime,
+        )
+        return token
+
+    @classmethod
+    def consume(cls, token):
+        """
+        Mark a valid token used and return its user id, or None
+
+        A single UPDATE ... RETURNING, so a token can only be consumed once
+        even under concurrent requests.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET used = %s "
+                f"WHERE token_hash = %s AND used = %s AND expires_at > %s "
+                f"RETURNING user_id",
+                [True, hash_token(token), False, timezone.now()],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def purge(cls):
+        """Delete used and expired tokens; returns the number deleted."""
+        deleted, _ = cls.objects.filter(
+            models.Q(used=True) | models.Q(expires_at__lte=timezone.now())
+        ).delete()
+        return deleted
+
+
+class PasswordResetToken(SingleUseToken):
+    lifetime = timedelta(hours=1)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="password_reset_tokens",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["token_hash"],
+                condition=models.Q(used=False),
+                name="authapi_reset_unused_idx",
+            ),
+            models.Index(fields=["expires_at"], name="authapi_reset_expires_idx"),
+        ]
 
     def __str__(self):
         return f"PasswordResetToken for {self.user.email}"
 
 
-class EmailVerificationToken(models.Model):
+class EmailVerificationToken(SingleUseToken):
+    lifetime = timedelta(days=7)
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="email_verification_tokens",
     )
-    token = models.CharField(max_length=64, unique=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    used = models.BooleanField(default=False)
-
-    def is_valid(self):
-        """Token is valid for 7 days and hasn't been used."""
-        if self.used:
-            return False
-        age = timezone.now() - self.created_at
-        return age.total_seconds() < 604800  # 7 days
 
-    @classmethod
-    def create_for_user(cls, user):
-        """Create a new email verification token for a user."""
-        token = secrets.token_urlsafe(32)
-        return cls.objects.create(user=user, token=token)
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["token_hash"],
+                condition=models.Q(used=False),
+                name="authapi_verify_unused_idx",
+            ),
+            models.Index(fields=["expires_at"], name="authapi_verify_expires_idx"),
+        ]
 
     def __str__(self):
         return f"EmailVerificationToken for {self.user.email}"
@@ -0,0 +1,59 @@
+"""
+Per-user cache of the serialized `CurrentUserView` profile.
+
+The profile is rendered once to JSON bytes and stored with its ETag, so a hot
+`/api/auth/user/` is a single cache GET with no serializer work. Entries are
+dropped whenever the user row is saved or deleted (see `authapi.signals`),
+which covers email verification, password changes and account deletion.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from metrics.collectors import track_cache_operation
+from rest_framework.renderers import JSONRenderer
+
+from .serializers import UserSerializer
+
+PROFILE_KEY_PREFIX = "authapi:profile"
+
+# Bump when UserSerializer's output changes so stale blobs are not served
+PROFILE_VERSION = 1
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def profile_cache_key(user_id):
+    return f"{PROFILE_KEY_PREFIX}:v{PROFILE_VERSION}:{user_id}"
+
+
+def get_profile(user_id):
+    """Return `(etag, body)` for an active user's serialized profile, or None."""
+    profile = cache.get(profile_cache_key(user_id))
+    if profile is not None:
+        track_cache_operation("hit", PROFILE_KEY_PREFIX)
+        return profile
+
+    track_cache_operation("miss", PROFILE_KEY_PREFIX)
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None or not user.is_active:
+        return None
+
+    body = JSONRenderer().render(UserSerializer(user).data)
+    profile = (f'"{hashlib.md5(body).hexdigest()}"', body)
+
+    cache.set(profile_cache_key(user_id), profile, timeout=_profile_timeout(user))
+    track_cache_operation("set", PROFILE_KEY_PREFIX)
+    return profile
+
+
+def _profile_timeout(user):
+    """Expire unverified profiles when `days_until_deletion` next changes"""
+    timeout = settings.AUTH_PROFILE_CACHE_TTL
+    if not user.email_verified:
+        age = (timezone.now() - user.created_at).total_seconds()
+        timeout = min(timeout, int(SECONDS_PER_DAY - age % SECONDS_PER_DAY) + 1)
+    return timeout
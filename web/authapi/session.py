@@ -0,0 +1,76 @@
+"""
+Compact per-user session auth record.
+
+Django re-reads the `User` row on every request to check the session's auth
+hash (an HMAC of the password hash), which is what logs other devices out
+after a password change. `session_is_valid` performs the same check against
+the hash cached in Redis, so validating a session costs a session read and one
+cache read. The record is dropped whenever the user row is saved or deleted.
+"""
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+    get_user_model,
+)
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from metrics.collectors import track_cache_operation
+
+SESSION_AUTH_KEY_PREFIX = "authapi:session_auth"
+
+# Cached for deleted and inactive users so misses are cached too
+NO_USER = ""
+
+
+def session_auth_cache_key(user_id):
+    return f"{SESSION_AUTH_KEY_PREFIX}:{user_id}"
+
+
+def _auth_fields():
+    # `is_active` is a plain attribute of AbstractBaseUser unless the user
+    # model declares it as a field
+    fields = {field.name for field in get_user_model()._meta.concrete_fields}
+    return ["password"] + (["is_active"] if "is_active" in fields else [])
+
+
+def get_session_auth_hash(user_id):
+    """Return the user's current session auth hash, or "" if they can't log in."""
+    auth_hash = cache.get(session_auth_cache_key(user_id))
+    if auth_hash is not None:
+        track_cache_operation("hit", SESSION_AUTH_KEY_PREFIX)
+        return auth_hash
+
+    track_cache_operation("miss", SESSION_AUTH_KEY_PREFIX)
+    user = get_user_model().objects.filter(pk=user_id).only(*_auth_fields()).first()
+    # ModelBackend.get_user doesn't return inactive users
+    auth_hash = user.get_session_auth_hash() if user and user.is_active else NO_USER
+
+    cache.set(
+        session_auth_cache_key(user_id),
+        auth_hash,
+        timeout=settings.AUTH_SESSION_RECORD_TTL,
+    )
+    track_cache_operation("set", SESSION_AUTH_KEY_PREFIX)
+    return auth_hash
+
+
+def session_is_valid(session):
+    """
+    Whether the session belongs to a logged-in user, without loading the user
+
+    Mirrors the checks in `django.contrib.auth.get_user`, including
+    ModelBackend's rejection of inactive users.
+    """
+    user_id = session.get(SESSION_KEY)
+    if user_id is None:
+        return False
+    if session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return False
+
+    auth_hash = get_session_auth_hash(user_id)
+    return bool(auth_hash) and constant_time_compare(
+        session.get(HASH_SESSION_KEY, ""), auth_hash
+    )
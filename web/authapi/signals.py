@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .profile import profile_cache_key
+from .session import session_auth_cache_key
+
+_suppressed = Local()
+
+
+def cached_user_state_keys(user_ids):
+    """The cache keys holding the session auth hash and profile of each user"""
+    return [
+        key
+        for user_id in user_ids
+        for key in (session_auth_cache_key(user_id), profile_cache_key(user_id))
+    ]
+
+
+@contextmanager
+def bulk_user_changes():
+    """
+    Skip per-user cache invalidation in the block
+
+    The caller clears `cached_user_state_keys` for the users it changed.
+    """
+    _suppressed.active = True
+    try:
+        yield
+    finally:
+        del _suppressed.active
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_cached_user_state(sender, instance, **kwargs):
+    """Drop the cached session auth hash and profile in one round trip"""
+    if getattr(_suppressed, "active", False):
+        return
+    cache.delete_many(cached_user_state_keys([instance.pk]))
@@ -1,8 +1,8 @@
 from celery import shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.utils import timezone
+from mail.outbox import queue_messages
+from mail.rendering import render_email
 
 User = get_user_model()
 
@@ -18,42 +18,24 @@ def send_verification_email(user_id, ip_address=None):
         return
 
     # Create verification token
-    token_obj = EmailVerificationToken.create_for_user(user)
+    token = EmailVerificationToken.create_for_user(user)
 
     # Build verification URL
     base_url = settings.SITE_BASE_DOMAIN.rstrip("/")
-    verify_url = f"{base_url}/verify-email/{token_obj.token}"
-
-    subject = "Verify your email address"
-
-    ip_line = ""
-    if ip_address:
-        ip_line = f"\nThe request for this verification originated from IP address {ip_address}\n"
-
-    message = f"""Verify your email address
-
-You need to verify your email address to continue using your account. Click the link below to verify your email address:
-
-{verify_url}
-
-This link will expire in 7 days.
-{ip_line}
-In case you did not sign up for this account and are seeing this email, please follow the instructions below:
-
-- Reset your password: {base_url}/forgot-password
-- Check if any changes were made to your account settings. If yes, revert them immediately.
-- If you are unable to access your account, please contact us.
-
-Thanks,
-Thatcher
-"""
-
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False,
+    verify_url = f"{base_url}/verify-email/{token}"
+
+    queue_messages(
+        [
+            render_email(
+                "verify_email",
+                {
+                    "verify_url": verify_url,
+                    "base_url": base_url,
+                    "ip_address": ip_address,
+                },
+                to=[user.email],
+            )
+        ]
     )
 
 
@@ -68,47 +50,36 @@ def send_password_reset_email(user_id):
         return
 
     # Create reset token
-    token_obj = PasswordResetToken.create_for_user(user)
+    token = PasswordResetToken.create_for_user(user)
 
     # Build reset URL
     base_url = settings.SITE_BASE_DOMAIN.rstrip("/")
-    reset_url = f"{base_url}/reset-password/{token_obj.token}"
-
-    subject = "Reset your password"
-    message = f"""Hi,
+    reset_url = f"{base_url}/reset-password/{token}"
 
-You requested to reset your password. Click the link below to set a new password:
-
-{reset_url}
-
-This link will expire in 1 hour.
-
-If you didn't request this, you can ignore this email.
-
-Thanks,
-The Team
-"""
-
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=False,
+    queue_messages(
+        [render_email("password_reset", {"reset_url": reset_url}, to=[user.email])]
     )
 
 
 @shared_task
 def cleanup_unverified_accounts():
     """Delete user accounts that haven't verified their email within 7 days."""
-    cutoff = timezone.now() - timezone.timedelta(days=7)
+    from .cleanup import delete_unverified_accounts
 
-    unverified_users = User.objects.filter(
-        email_verified=False,
-        created_at__lt=cutoff,
-    )
+    deleted, done = delete_unverified_accounts()
+    if not done:
+        # Out of time budget; pick up from the stored cursor in a fresh task
+        cleanup_unverified_accounts.delay()
+
+    return f"Deleted {deleted} unverified accounts"
+
+
+@shared_task
+def purge_used_tokens():
+    """Delete used and expired password reset / email verification tokens."""
+    from .models import EmailVerificationToken, PasswordResetToken
 
-    count = unverified_users.count()
-    unverified_users.delete()
+    reset = PasswordResetToken.purge()
+    verification = EmailVerificationToken.purge()
 
-    return f"Deleted {count} unverified accounts"
+    return f"Purged {reset} password reset and {verification} verification tokens"
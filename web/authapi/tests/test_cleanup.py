@@ -0,0 +1,56 @@
+from unittest import mock
+
+from authapi.cleanup import CURSOR_KEY, delete_unverified_accounts
+from authapi.models import EmailVerificationToken
+from authapi.signals import cached_user_state_keys
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class DeleteUnverifiedAccountsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        stale = timezone.now() - timezone.timedelta(days=8)
+        for i in range(5):
+            user = User.objects.create(email=f"spam{i}@example.com", created_at=stale)
+            EmailVerificationToken.create_for_user(user)
+        User.objects.create(email="new@example.com")
+        User.objects.create(
+            email="verified@example.com", email_verified=True, created_at=stale
+        )
+
+    def test_deletes_stale_unverified_accounts_in_batches(self):
+        self.assertEqual(delete_unverified_accounts(batch_size=2), (5, True))
+
+        self.assertEqual(
+            set(User.objects.values_list("email", flat=True)),
+            {"new@example.com", "verified@example.com"},
+        )
+        self.assertFalse(EmailVerificationToken.objects.exists())
+        self.assertIsNone(cache.get(CURSOR_KEY))
+
+    def test_exhausted_time_budget_leaves_cursor_to_resume_from(self):
+        deleted, done = delete_unverified_accounts(batch_size=2, time_budget=1e-9)
+
+        self.assertEqual((deleted, done), (2, False))
+        self.assertIsNotNone(cache.get(CURSOR_KEY))
+        self.assertEqual(delete_unverified_accounts(batch_size=2), (3, True))
+
+    def test_cached_user_state_is_cleared_once_per_batch(self):
+        pks = list(
+            User.objects.filter(email__startswith="spam").values_list("pk", flat=True)
+        )
+        keys = cached_user_state_keys(pks)
+        cache.set_many(dict.fromkeys(keys, "cached"))
+
+        with mock.patch.object(
+            cache, "delete_many", wraps=cache.delete_many
+        ) as delete_many:
+            delete_unverified_accounts(batch_size=5)
+
+        delete_many.assert_called_once()
+        self.assertEqual(cache.get_many(keys), {})
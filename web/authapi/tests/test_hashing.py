@@ -0,0 +1,45 @@
+import os
+import signal
+
+from authapi import hashing
+from authapi.hashing import PooledPBKDF2PasswordHasher
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import SimpleTestCase, override_settings
+
+
+class PooledPBKDF2PasswordHasherTest(SimpleTestCase):
+    def test_hashes_match_djangos_pbkdf2_hasher(self):
+        salt = "abcdefghijklmnopqrstuv"
+
+        self.assertEqual(
+            PooledPBKDF2PasswordHasher().encode("secret", salt, 1000),
+            PBKDF2PasswordHasher().encode("secret", salt, 1000),
+        )
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1)
+class HashingPoolTest(SimpleTestCase):
+    def setUp(self):
+        previous = hashing._executor
+        hashing._executor = None
+
+        def restore():
+            if hashing._executor is not None:
+                hashing._executor.shutdown()
+            hashing._executor = previous
+
+        self.addCleanup(restore)
+
+    def kill_workers(self):
+        for process in list(hashing.get_executor()._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+    def test_pool_is_replaced_when_a_worker_dies(self):
+        salt = "abcdefghijklmnopqrstuv"
+        expected = PBKDF2PasswordHasher().encode("secret", salt, 1000)
+        hasher = PooledPBKDF2PasswordHasher()
+        hasher.encode("secret", salt, 1000)
+
+        self.kill_workers()
+        self.assertEqual(hasher.encode("secret", salt, 1000), expected)
@@ -0,0 +1,45 @@
+import unittest
+
+from authapi.models import PasswordResetToken
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Checks PostgreSQL plans")
+class HotQueryIndexTest(TestCase):
+    def setUp(self):
+        # The test tables are tiny, so make the planner show what it would
+        # pick on a large table
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        self.assertIn(index_name, queryset.explain())
+
+    def test_case_insensitive_email_lookup(self):
+        self.assertUsesIndex(
+            User.objects.filter(email__iexact="Someone@Example.com"),
+            "user_email_upper_uniq",
+        )
+
+    def test_unverified_account_cleanup(self):
+        self.assertUsesIndex(
+            User.objects.filter(
+                email_verified=False, created_at__lt=timezone.now()
+            ).order_by("created_at", "pk"),
+            "user_unverified_created_idx",
+        )
+
+    def test_token_lookup_and_purge(self):
+        self.assertUsesIndex(
+            PasswordResetToken.objects.filter(token_hash="0" * 64, used=False),
+            "authapi_reset_unused_idx",
+        )
+        self.assertUsesIndex(
+            PasswordResetToken.objects.filter(expires_at__lte=timezone.now()),
+            "authapi_reset_expires_idx",
+        )
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from authapi.profile import get_profile
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class CurrentUserViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("member@example.com", "password")
+        self.url = reverse("auth_user")
+
+    def test_anonymous_request_is_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_cached_profile_is_served_without_queries(self):
+        self.client.force_login(self.user)
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.json()["email"], "member@example.com")
+        self.assertEqual(second.json()["days_until_deletion"], 7)
+
+    def test_matching_etag_returns_not_modified(self):
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_email_verification_refreshes_profile(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        self.user.email_verified = True
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertTrue(response.json()["email_verified"])
+        self.assertIsNone(response.json()["days_until_deletion"])
+
+    def test_deactivated_user_is_forbidden(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        with mock.patch.object(User, "is_active", False):
+            self.user.save()
+
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+            self.assertIsNone(get_profile(self.user.pk))
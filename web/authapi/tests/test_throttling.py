@@ -0,0 +1,52 @@
+from unittest import mock
+
+from authapi.throttling import SlidingWindowThrottle
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.url = reverse("auth_login")
+        # Keep every attempt in one window; crossing into the next one would
+        # let the earlier attempts decay and the limit be missed
+        timer = mock.patch.object(
+            SlidingWindowThrottle, "timer", return_value=1_800_000_000.0
+        )
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def login(self, email, ip="10.0.0.1"):
+        return self.client.post(
+            self.url,
+            {"email": email, "password": "wrong-password"},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_repeated_attempts_for_one_email_are_throttled_before_hashing(self):
+        for i in range(10):
+            self.assertEqual(
+                self.login("victim@example.com", ip=f"10.0.1.{i}").status_code, 401
+            )
+
+        with mock.patch("authapi.views.authenticate") as authenticate:
+            response = self.login("victim@example.com", ip="10.0.2.1")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        authenticate.assert_not_called()
+
+    def test_ip_limit_applies_across_emails(self):
+        for i in range(20):
+            self.login(f"user{i}@example.com")
+
+        self.assertEqual(self.login("another@example.com").status_code, 429)
+        self.assertEqual(
+            self.login("another@example.com", ip="10.0.0.2").status_code, 401
+        )
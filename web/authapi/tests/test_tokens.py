@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from authapi.models import EmailVerificationToken, PasswordResetToken
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class SingleUseTokenTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("member@example.com", "password")
+
+    def test_token_is_stored_as_digest_and_consumed_once(self):
+        token = PasswordResetToken.create_for_user(self.user)
+
+        self.assertFalse(PasswordResetToken.objects.filter(token_hash=token).exists())
+        self.assertEqual(PasswordResetToken.consume(token), self.user.pk)
+        self.assertIsNone(PasswordResetToken.consume(token))
+
+    def test_expired_token_is_rejected_and_purged(self):
+        token = PasswordResetToken.create_for_user(self.user)
+        PasswordResetToken.objects.update(
+            expires_at=PasswordResetToken.objects.get().created_at - timedelta(1)
+        )
+
+        self.assertIsNone(PasswordResetToken.consume(token))
+        self.assertEqual(PasswordResetToken.purge(), 1)
+
+    def test_verify_email_view(self):
+        token = EmailVerificationToken.create_for_user(self.user)
+        url = reverse("auth_verify_email", args=[token])
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.email_verified)
+
+    def test_reset_password_view(self):
+        token = PasswordResetToken.create_for_user(self.user)
+        data = {
+            "token": token,
+            "password": "n3w-Passw0rd!",
+            "password_confirm": "n3w-Passw0rd!",
+        }
+        url = reverse("auth_reset_password")
+
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        self.assertEqual(self.client.post(url, data).status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("n3w-Passw0rd!"))
@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class ValidateSessionViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("member@example.com", "password")
+        self.url = reverse("auth_validate")
+
+    def test_anonymous_session_is_invalid(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), {"valid": False})
+
+    def test_logged_in_session_is_valid_without_user_query(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), {"valid": True})
+
+    def test_matching_etag_returns_not_modified(self):
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_password_change_invalidates_other_sessions(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        self.user.set_password("new-password")
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.url).json(), {"valid": False})
+
+    def test_deactivation_invalidates_sessions(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+        with mock.patch.object(User, "is_active", False):
+            self.user.save()
+
+            self.assertEqual(self.client.get(self.url).json(), {"valid": False})
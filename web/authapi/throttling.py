@@ -0,0 +1,122 @@
+"""
+Cache-backed sliding-window throttles for the auth endpoints.
+
+DRF runs throttles before the view handler, so rejected login and registration
+attempts never reach the password hasher. Each view sets `throttle_scope` and
+each throttle class looks up the rate for `<scope>_<kind>` (e.g. `login_email`)
+in `REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]`; a missing rate disables it.
+
+Counts are kept as two fixed-window counters in the cache (`add` + `incr` are
+atomic on Redis, so every web process shares them), weighted into a sliding
+window estimate. Unlike DRF's SimpleRateThrottle this costs no list rewrites
+and does not lose updates under concurrency.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from metrics.collectors import track_auth_throttle
+from rest_framework.throttling import SimpleRateThrottle
+
+THROTTLE_KEY_PREFIX = "authapi:throttle"
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    kind = None
+
+    def __init__(self):
+        # The rate depends on the view's scope, so it is resolved per request
+        pass
+
+    def get_cache_key(self, request, view):
+        """Return the identity to count requests against, or None to skip"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None:
+            return True
+
+        self.scope = f"{scope}_{self.kind}"
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        ident = self.get_cache_key(request, view)
+        if ident is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        key = f"{THROTTLE_KEY_PREFIX}:{self.scope}:{ident}"
+
+        current_key = f"{key}:{window}"
+        cache.add(current_key, 0, timeout=self.duration * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # The counter expired between add and incr
+            return True
+        if current is None:
+            # Cache unavailable; fail open rather than lock everyone out
+            return True
+        previous = cache.get(f"{key}:{window - 1}", 0)
+
+        elapsed = (self.now % self.duration) / self.duration
+        self.estimate = previous * (1 - elapsed) + current
+        if self.estimate > self.num_requests:
+            track_auth_throttle(self.scope, "throttled")
+            return False
+
+        track_auth_throttle(self.scope, "allowed")
+        return True
+
+    def wait(self):
+        # Until enough of the previous window has slid out
+        return self.duration - (self.now % self.duration)
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """
+    Keyed by client address
+
+    Uses DRF's `get_ident`, which honours NUM_PROXIES, rather than
+    `get_client_ip`: the first X-Forwarded-For entry is client-supplied and
+    would let an attacker pick a fresh key per request.
+    """
+
+    kind = "ip"
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """Keyed by the submitted email, against attacks spread over many IPs"""
+
+    kind = "email"
+
+    def get_cache_key(self, request, view):
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class UserThrottle(SlidingWindowThrottle):
+    kind = "user"
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return request.user.pk
+
+
+class GlobalThrottle(SlidingWindowThrottle):
+    """Caps the total rate across all clients so hashing cost stays bounded"""
+
+    kind = "global"
+
+    def get_cache_key(self, request, view):
+        return "all"
@@ -1,13 +1,27 @@
+from celeryapp.enqueue import enqueue
 from django.conf import settings
-from django.contrib.auth import authenticate, get_user_model, login, logout
+from django.contrib.auth import (
+    SESSION_KEY,
+    authenticate,
+    get_user_model,
+    login,
+    logout,
+)
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import EmailVerificationToken, PasswordResetToken
+from .profile import get_profile
+from .session import session_is_valid
 
 
 def get_client_ip(request):
@@ -28,12 +42,15 @@ from .serializers import (
     UserSerializer,
 )
 from .tasks import send_password_reset_email, send_verification_email
+from .throttling import EmailThrottle, GlobalThrottle, IPThrottle, UserThrottle
 
 User = get_user_model()
 
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, GlobalThrottle]
+    throttle_scope = "register"
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -45,7 +62,7 @@ class RegisterView(APIView):
         )
 
         client_ip = get_client_ip(request)
-        send_verification_email.delay(user.id, ip_address=client_ip)
+        enqueue(send_verification_email.s(user.id, ip_address=client_ip))
 
         # Log the user in
         login(request, user, backend="django.contrib.auth.backends.ModelBackend")
@@ -61,6 +78,8 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, EmailThrottle, GlobalThrottle]
+    throttle_scope = "login"
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -96,18 +115,53 @@ class LogoutView(APIView):
         return Response({"message": "Logged out successfully."})
 
 
-class CurrentUserView(APIView):
-    permission_classes = [IsAuthenticated]
+class CurrentUserView(View):
+    """
+    Profile of the logged-in user, polled by the frontend
+
+    Like `ValidateSessionView` this skips DRF and never loads `request.user`;
+    the body is served pre-encoded from the profile cache.
+    """
+
+    http_method_names = ["get"]
 
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        profile = None
+        if session_is_valid(request.session):
+            profile = get_profile(request.session[SESSION_KEY])
+        if profile is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
+        etag, body = profile
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
 
-class ValidateSessionView(APIView):
-    permission_classes = [AllowAny]
+
+class ValidateSessionView(View):
+    """
+    Session check hit by the frontend on every navigation
+
+    A plain Django view rather than DRF, and it never loads `request.user`:
+    the session comes from the session cache and its auth hash is checked
+    against the cached record in `authapi.session`.
+    """
+
+    http_method_names = ["get"]
 
     def get(self, request):
-        return Response({"valid": request.user.is_authenticated})
+        valid = session_is_valid(request.session)
+
+        response = JsonResponse({"valid": valid})
+        response["ETag"] = '"valid"' if valid else '"invalid"'
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
 
 
 class ChangePasswordView(APIView):
@@ -161,6 +215,8 @@ class DeleteAccountView(APIView):
 
 class ForgotPasswordView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = "password_reset"
 
     def post(self, request):
         serializer = ForgotPasswordSerializer(data=request.data)
@@ -171,7 +227,7 @@ class ForgotPasswordView(APIView):
         # Always return success to prevent email enumeration
         try:
             user = User.objects.get(email__iexact=email)
-            send_password_reset_email.delay(user.id)
+            enqueue(send_password_reset_email.s(user.id))
         except User.DoesNotExist:
             pass
 
@@ -189,30 +245,21 @@ class ResetPasswordView(APIView):
         serializer = ResetPasswordSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        try:
-            token_obj = PasswordResetToken.objects.get(
-                token=serializer.validated_data["token"]
-            )
-        except PasswordResetToken.DoesNotExist:
-            return Response(
-                {"error": "Invalid or expired reset link."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if not token_obj.is_valid():
-            return Response(
-                {"error": "Invalid or expired reset link."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        # Hash before the transaction so the token row isn't locked meanwhile
+        password = make_password(serializer.validated_data["password"])
 
-        # Update password
-        user = token_obj.user
-        user.set_password(serializer.validated_data["password"])
-        user.save()
+        with transaction.atomic():
+            user_id = PasswordResetToken.consume(serializer.validated_data["token"])
+            if user_id is None:
+                return Response(
+                    {"error": "Invalid or expired reset link."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-        # Mark token as used
-        token_obj.used = True
-        token_obj.save()
+            # Update password
+            user = User.objects.get(pk=user_id)
+            user.password = password
+            user.save()
 
         return Response({"message": "Password reset successfully. You can now log in."})
 
@@ -221,35 +268,27 @@ class VerifyEmailView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, token):
-        try:
-            token_obj = EmailVerificationToken.objects.get(token=token)
-        except EmailVerificationToken.DoesNotExist:
-            return Response(
-                {"error": "Invalid or expired verification link."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if not token_obj.is_valid():
-            return Response(
-                {"error": "Invalid or expired verification link."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Mark email as verified
-        user = token_obj.user
-        user.email_verified = True
-        user.email_verified_at = timezone.now()
-        user.save()
-
-        # Mark token as used
-        token_obj.used = True
-        token_obj.save()
+        with transaction.atomic():
+            user_id = EmailVerificationToken.consume(token)
+            if user_id is None:
+                return Response(
+                    {"error": "Invalid or expired verification link."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Mark email as verified
+            user = User.objects.get(pk=user_id)
+            user.email_verified = True
+            user.email_verified_at = timezone.now()
+            user.save()
 
         return Response({"message": "Email verified successfully."})
 
 
 class ResendVerificationView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [IPThrottle, UserThrottle]
+    throttle_scope = "resend_verification"
 
     def post(self, request):
         user = request.user
@@ -261,7 +300,7 @@ class ResendVerificationView(APIView):
             )
 
         client_ip = get_client_ip(request)
-        send_verification_email.delay(user.id, ip_address=client_ip)
+        enqueue(send_verification_email.s(user.id, ip_address=client_ip))
 
         return Response({"message": "Verification email sent."})
 
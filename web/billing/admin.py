@@ -1,22 +1,37 @@
+from core.pagination import EstimatedCountPaginator
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import StripeCustomer, Subscription
+from .models import StripeCustomer, Subscription, WebhookEvent
 
 
 @admin.register(StripeCustomer)
 class StripeCustomerAdmin(admin.ModelAdmin):
     list_display = ["user", "stripe_customer_id", "has_active_sub", "created_at"]
     search_fields = ["user__email", "stripe_customer_id"]
-    readonly_fields = ["stripe_customer_id", "created_at"]
+    readonly_fields = [
+        "stripe_customer_id",
+        "current_subscription",
+        "entitlement_status",
+        "created_at",
+    ]
+    raw_id_fields = ["user"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # __str__ reads user.email; this also covers autocomplete results
+        return super().get_queryset(request).select_related("user")
 
     def has_active_sub(self, obj):
         """Show subscription status with color coding"""
+        # Reads the denormalized entitlement_status, so no per-row query
         if obj.has_active_subscription:
             return format_html('<span style="color: green;">✓ Active</span>')
         return format_html('<span style="color: gray;">No subscription</span>')
 
     has_active_sub.short_description = "Subscription"
+    has_active_sub.admin_order_field = "entitlement_status"
 
 
 @admin.register(Subscription)
@@ -42,6 +57,10 @@ class SubscriptionAdmin(admin.ModelAdmin):
         "days_until_period_end",
     ]
     ordering = ["-created_at"]
+    list_select_related = ["customer__user"]
+    autocomplete_fields = ["customer"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def customer_email(self, obj):
         return obj.customer.user.email
@@ -71,3 +90,36 @@ class SubscriptionAdmin(admin.ModelAdmin):
         if obj:
             return self.readonly_fields + ["customer"]
         return self.readonly_fields
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = [
+        "stripe_event_id",
+        "type",
+        "status",
+        "attempts",
+        "received_at",
+        "processed_at",
+    ]
+    list_filter = ["status", "type", "received_at"]
+    search_fields = ["stripe_event_id", "type"]
+    readonly_fields = [
+        "stripe_event_id",
+        "type",
+        "payload",
+        "attempts",
+        "last_error",
+        "received_at",
+        "processed_at",
+    ]
+    ordering = ["-received_at"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match.url_name.endswith("_changelist"):
+            # Payloads are only shown on the change page
+            queryset = queryset.defer("payload")
+        return queryset
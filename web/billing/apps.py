@@ -5,3 +5,8 @@ class BillingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "billing"
     verbose_name = "Billing"
+
+    def ready(self):
+        from .stripe_client import configure_stripe
+
+        configure_stripe()
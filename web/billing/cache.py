@@ -0,0 +1,60 @@
+"""
+Per-user subscription entitlement cache.
+
+`check_subscription_access` reads a single Redis key per request. The key is
+refreshed whenever a subscription row is written (Stripe sync, webhooks) and
+dropped on cancel/reactivate, so the database is only hit on a cache miss,
+and then only for the customer's denormalized `entitlement_status`.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from metrics.collectors import track_cache_operation
+
+from .models import NO_SUBSCRIPTION, StripeCustomer
+
+ENTITLEMENT_KEY_PREFIX = "billing:entitlement"
+
+
+def entitlement_cache_key(user_id):
+    return f"{ENTITLEMENT_KEY_PREFIX}:{user_id}"
+
+
+def get_entitlement(user_id):
+    """Return the active subscription status for a user, or "none"."""
+    status = cache.get(entitlement_cache_key(user_id))
+    if status is not None:
+        track_cache_operation("hit", ENTITLEMENT_KEY_PREFIX)
+        return status
+
+    track_cache_operation("miss", ENTITLEMENT_KEY_PREFIX)
+    return refresh_entitlement(user_id)
+
+
+def refresh_entitlement(user_id):
+    """Re-read a user's entitlement from the database and cache it."""
+    status = (
+        StripeCustomer.objects.filter(user_id=user_id)
+        .values_list("entitlement_status", flat=True)
+        .first()
+    ) or NO_SUBSCRIPTION
+
+    cache.set(
+        entitlement_cache_key(user_id),
+        status,
+        timeout=settings.BILLING_ENTITLEMENT_CACHE_TTL,
+    )
+    track_cache_operation("set", ENTITLEMENT_KEY_PREFIX)
+    return status
+
+
+def invalidate_entitlement(user_id):
+    """Drop a user's cached entitlement so the next read hits the database."""
+    cache.delete(entitlement_cache_key(user_id))
+    track_cache_operation("delete", ENTITLEMENT_KEY_PREFIX)
+
+
+def invalidate_entitlements(user_ids):
+    """Drop cached entitlements for many users in one round trip."""
+    cache.delete_many([entitlement_cache_key(user_id) for user_id in user_ids])
+    track_cache_operation("delete", ENTITLEMENT_KEY_PREFIX)
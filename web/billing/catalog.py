@@ -0,0 +1,150 @@
+"""
+Local Stripe price/product catalog.
+
+Plan names are resolved from an in-process TTL cache backed by the shared
+Redis cache, so request handlers never call the Stripe API. The Redis layer
+is warmed by a Celery task at worker startup and kept current by the
+`price.*`/`product.*` webhooks. Unknown prices fall back to the default plan
+name and schedule a background refresh.
+"""
+
+import threading
+
+import stripe
+import structlog
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from metrics.collectors import track_cache_operation
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_PLAN_NAME = "Pro"
+
+PRICE_KEY_PREFIX = "billing:price"
+PRODUCT_KEY_PREFIX = "billing:product"
+REFRESH_LOCK_PREFIX = "billing:price-refresh"
+
+# TTLCache is not thread-safe; Daphne serves sync views from a thread pool
+_local_lock = threading.Lock()
+_local_plan_names = TTLCache(
+    maxsize=settings.BILLING_PRICE_CATALOG_LOCAL_SIZE,
+    ttl=settings.BILLING_PRICE_CATALOG_LOCAL_TTL,
+)
+
+
+def price_cache_key(price_id):
+    return f"{PRICE_KEY_PREFIX}:{price_id}"
+
+
+def product_cache_key(product_id):
+    return f"{PRODUCT_KEY_PREFIX}:{product_id}"
+
+
+def _get_id(value):
+    """Return the id of an expanded Stripe object or the id string itself."""
+    if isinstance(value, str):
+        return value
+    if value:
+        return value.get("id")
+    return None
+
+
+def get_plan_name(price_id, default=DEFAULT_PLAN_NAME):
+    """Return the product name for a Stripe price without calling Stripe."""
+    with _local_lock:
+        plan_name = _local_plan_names.get(price_id)
+    if plan_name is not None:
+        track_cache_operation("local_hit", PRICE_KEY_PREFIX)
+        return plan_name
+
+    product_id = cache.get(price_cache_key(price_id))
+    plan_name = cache.get(product_cache_key(product_id)) if product_id else None
+    if plan_name is None:
+        track_cache_operation("miss", PRICE_KEY_PREFIX)
+        _schedule_refresh(price_id)
+        return default
+
+    track_cache_operation("hit", PRICE_KEY_PREFIX)
+    with _local_lock:
+        _local_plan_names[price_id] = plan_name
+    return plan_name
+
+
+def _schedule_refresh(price_id):
+    """Queue a background fetch of an unknown price, at most once per TTL."""
+    if not cache.add(
+        f"{REFRESH_LOCK_PREFIX}:{price_id}",
+        1,
+        timeout=settings.BILLING_PRICE_CATALOG_LOCAL_TTL,
+    ):
+        return
+
+    from .tasks import refresh_price
+
+    try:
+        refresh_price.delay(price_id)
+    except Exception as e:
+        logger.error(f"Could not schedule refresh for price {price_id}: {str(e)}")
+
+
+def store_product(product):
+    """Cache a Stripe product's display name."""
+    cache.set(
+        product_cache_key(product["id"]),
+        product.get("name") or DEFAULT_PLAN_NAME,
+        timeout=settings.BILLING_PRICE_CATALOG_TTL,
+    )
+    # Names of prices pointing at this product are refreshed lazily
+    with _local_lock:
+        _local_plan_names.clear()
+
+
+def store_price(price):
+    """Cache a Stripe price, and its product if it was expanded."""
+    product = price.get("product")
+    product_id = _get_id(product)
+    if not product_id:
+        return
+
+    if not isinstance(product, str):
+        store_product(product)
+
+    cache.set(
+        price_cache_key(price["id"]),
+        product_id,
+        timeout=settings.BILLING_PRICE_CATALOG_TTL,
+    )
+    with _local_lock:
+        _local_plan_names.pop(price["id"], None)
+
+
+def remove_price(price_id):
+    cache.delete(price_cache_key(price_id))
+    with _local_lock:
+        _local_plan_names.pop(price_id, None)
+
+
+def remove_product(product_id):
+    cache.delete(product_cache_key(product_id))
+    with _local_lock:
+        _local_plan_names.clear()
+
+
+def refresh_price(price_id):
+    """Fetch a single price (with its product) from Stripe into the catalog."""
+    price = stripe.Price.retrieve(price_id, expand=["product"])
+    store_price(price)
+    return price
+
+
+def warm_price_catalog():
+    """Load every active price and product from Stripe into the catalog."""
+    count = 0
+    prices = stripe.Price.list(active=True, expand=["data.product"], limit=100)
+    for price in prices.auto_paging_iter():
+        store_price(price)
+        count += 1
+
+    logger.info(f"Warmed price catalog with {count} prices")
+    return count
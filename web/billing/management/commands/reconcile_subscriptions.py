@@ -0,0 +1,37 @@
+from billing.reconcile import reconcile_subscriptions, reconcile_windows
+from billing.tasks import reconcile_all_subscriptions
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Reconcile local subscriptions with Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=settings.BILLING_RECONCILE_SHARDS,
+            help="Number of `created` windows to split the reconcile into",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="run_async",
+            help="Enqueue the windows on Celery instead of running them here",
+        )
+
+    def handle(self, *args, **options):
+        if options["run_async"]:
+            result = reconcile_all_subscriptions.delay(options["shards"])
+            self.stdout.write(f"Enqueued reconcile task {result.id}")
+            return
+
+        total = 0
+        for created_gte, created_lt in reconcile_windows(options["shards"]):
+            total += reconcile_subscriptions(created_gte, created_lt)
+            self.stdout.write(
+                f"Reconciled window [{created_gte}, {created_lt or 'now'})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {total} subscriptions"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.9 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0002_webhookevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subscription",
+            name="last_event_created",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="stripe_subscription_id",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="stripe_created",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="webhookevent",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("processed", "Processed"),
+                    ("skipped", "Skipped"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="webhookevent",
+            index=models.Index(
+                fields=["stripe_subscription_id", "status"],
+                name="billing_webhook_sub_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.9 on 2026-10-17 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+ACTIVE_STATUSES = ["active", "trialing"]
+NO_SUBSCRIPTION = "none"
+
+
+def backfill_current_subscription(apps, schema_editor):
+    StripeCustomer = apps.get_model("billing", "StripeCustomer")
+    Subscription = apps.get_model("billing", "Subscription")
+
+    active = Subscription.objects.filter(
+        customer=models.OuterRef("pk"), status__in=ACTIVE_STATUSES
+    ).order_by("-created_at")
+
+    StripeCustomer.objects.update(
+        current_subscription=models.Subquery(active.values("pk")[:1]),
+        entitlement_status=Coalesce(
+            models.Subquery(active.values("status")[:1]),
+            models.Value(NO_SUBSCRIPTION),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0003_webhook_event_ordering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stripecustomer",
+            name="current_subscription",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="billing.subscription",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stripecustomer",
+            name="entitlement_status",
+            field=models.CharField(default="none", max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["customer", "status", "-created_at"],
+                name="billing_sub_cust_status_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_current_subscription, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-17 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0004_stripecustomer_current_subscription"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookevent",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,34 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+# Subscription statuses that grant access to paid features
+ACTIVE_STATUSES = ["active", "trialing"]
+
+# Entitlement status of customers without an active subscription
+NO_SUBSCRIPTION = "none"
+
+
+class StripeCustomerQuerySet(models.QuerySet):
+    def refresh_current_subscription(self):
+        """
+        Recompute `current_subscription` and `entitlement_status` in one UPDATE
+
+        Must be called whenever a subscription's status changes.
+        """
+        active = Subscription.objects.filter(
+            customer=models.OuterRef("pk"), status__in=ACTIVE_STATUSES
+        ).order_by("-created_at")
+
+        return self.update(
+            current_subscription=models.Subquery(active.values("pk")[:1]),
+            entitlement_status=Coalesce(
+                models.Subquery(active.values("status")[:1]),
+                models.Value(NO_SUBSCRIPTION),
+            ),
+        )
+
 
 class StripeCustomer(models.Model):
     user = models.OneToOneField(
@@ -10,20 +37,44 @@ class StripeCustomer(models.Model):
         related_name="stripe_customer",
     )
     stripe_customer_id = models.CharField(max_length=255, unique=True, db_index=True)
+    # Newest active subscription and its status, maintained by
+    # StripeCustomerQuerySet.refresh_current_subscription
+    current_subscription = models.ForeignKey(
+        "Subscription",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    entitlement_status = models.CharField(max_length=50, default=NO_SUBSCRIPTION)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = StripeCustomerQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.email} - {self.stripe_customer_id}"
 
     @property
     def has_active_subscription(self):
         """Check if customer has any active subscription"""
-        return self.subscriptions.filter(status__in=["active", "trialing"]).exists()
+        return self.entitlement_status in ACTIVE_STATUSES
 
     @property
     def active_subscription(self):
         """Get the current active subscription (if any)"""
-        return self.subscriptions.filter(status__in=["active", "trialing"]).first()
+        return self.current_subscription
+
+    async def ahas_active_subscription(self):
+        """Async version of `has_active_subscription`"""
+        return self.has_active_subscription
+
+    async def aactive_subscription(self):
+        """Async version of `active_subscription`"""
+        if self.current_subscription_id is None:
+            return None
+        return await Subscription.objects.filter(
+            pk=self.current_subscription_id
+        ).afirst()
 
 
 class Subscription(models.Model):
@@ -46,11 +97,20 @@ class Subscription(models.Model):
     current_period_end = models.DateTimeField()
     cancel_at_period_end = models.BooleanField(default=False)
     trial_end = models.DateTimeField(null=True, blank=True)
+    # `created` timestamp of the newest Stripe event applied to this row
+    last_event_created = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Covers the newest-active-subscription lookup per customer
+            models.Index(
+                fields=["customer", "status", "-created_at"],
+                name="billing_sub_cust_status_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.user.email} - {self.status}"
@@ -58,7 +118,7 @@ class Subscription(models.Model):
     @property
     def is_active(self):
         """Check if subscription is currently active"""
-        return self.status in ["active", "trialing"]
+        return self.status in ACTIVE_STATUSES
 
     @property
     def is_trialing(self):
@@ -76,3 +136,43 @@ class Subscription(models.Model):
             delta = self.current_period_end - timezone.now()
             return max(0, delta.days)
         return 0
+
+
+class WebhookEvent(models.Model):
+    """A verified Stripe webhook event, stored before it is processed"""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("processed", "Processed"),
+        ("skipped", "Skipped"),
+        ("failed", "Failed"),
+    ]
+
+    stripe_event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=255, db_index=True)
+    # Subscription the event refers to, used to coalesce events per subscription
+    stripe_subscription_id = models.CharField(max_length=255, blank=True)
+    stripe_created = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    # When a task last claimed the event, to spot claims lost with a worker
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(
+                fields=["stripe_subscription_id", "status"],
+                name="billing_webhook_sub_status_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} - {self.stripe_event_id}"
@@ -0,0 +1,168 @@
+"""
+Bulk reconciliation of local subscriptions against Stripe.
+
+`stripe.Subscription.list` is streamed with auto-pagination and applied in
+chunks with a single `bulk_create(update_conflicts=True)` per chunk. The id
+of the last applied subscription is stored in Redis after every chunk, so a
+run that is interrupted (or backs off on a rate limit) resumes where it
+stopped. Large accounts are split into `created` windows that are
+reconciled concurrently by Celery workers.
+"""
+
+from datetime import datetime, timezone
+
+import stripe
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import invalidate_entitlements
+from .models import StripeCustomer, Subscription
+from .utils import has_subscription_fields, parse_stripe_subscription
+
+logger = structlog.get_logger(__name__)
+
+CURSOR_KEY_PREFIX = "billing:reconcile-cursor"
+CURSOR_TTL = 60 * 60 * 24
+
+# Fields overwritten on existing rows; created_at is left untouched
+UPDATE_FIELDS = [
+    "customer",
+    "stripe_price_id",
+    "status",
+    "current_period_end",
+    "cancel_at_period_end",
+    "trial_end",
+    "updated_at",
+]
+
+
+def cursor_key(created_gte=None, created_lt=None):
+    return f"{CURSOR_KEY_PREFIX}:{created_gte or ''}:{created_lt or ''}"
+
+
+def split_windows(created_gte, created_lt, shards):
+    """Split [created_gte, created_lt) into `shards` contiguous windows."""
+    step = max(1, (created_lt - created_gte) // shards)
+    bounds = list(range(created_gte, created_lt, step))[:shards] + [created_lt]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def reconcile_subscriptions(created_gte=None, created_lt=None, chunk_size=None):
+    """
+    Apply every Stripe subscription created in a window to the local table
+
+    Args:
+        created_gte: Unix timestamp lower bound (inclusive), or None
+        created_lt: Unix timestamp upper bound (exclusive), or None
+        chunk_size: Subscriptions written per bulk upsert
+
+    Returns:
+        int: Number of subscriptions written
+    """
+    chunk_size = chunk_size or settings.BILLING_RECONCILE_CHUNK_SIZE
+    key = cursor_key(created_gte, created_lt)
+
+    params = {"status": "all", "limit": 100}
+    created = {}
+    if created_gte is not None:
+        created["gte"] = created_gte
+    if created_lt is not None:
+        created["lt"] = created_lt
+    if created:
+        params["created"] = created
+
+    starting_after = cache.get(key)
+    if starting_after:
+        logger.info(f"Resuming reconcile window {key} after {starting_after}")
+        params["starting_after"] = starting_after
+
+    written = 0
+    chunk = []
+    for stripe_sub in stripe.Subscription.list(**params).auto_paging_iter():
+        chunk.append(stripe_sub)
+        if len(chunk) >= chunk_size:
+            written += _apply_chunk(chunk)
+            cache.set(key, chunk[-1]["id"], timeout=CURSOR_TTL)
+            chunk = []
+
+    if chunk:
+        written += _apply_chunk(chunk)
+
+    cache.delete(key)
+    logger.info(f"Reconciled {written} subscriptions in window {key}")
+    return written
+
+
+def _apply_chunk(stripe_subs):
+    """Upsert a chunk of Stripe subscriptions with a single query."""
+    rows = [
+        (stripe_sub["id"], parse_stripe_subscription(stripe_sub))
+        for stripe_sub in stripe_subs
+        if has_subscription_fields(stripe_sub)
+    ]
+
+    customers = {
+        stripe_customer_id: (customer_id, user_id)
+        for stripe_customer_id, customer_id, user_id in StripeCustomer.objects.filter(
+            stripe_customer_id__in={fields["stripe_customer_id"] for _, fields in rows}
+        ).values_list("stripe_customer_id", "id", "user_id")
+    }
+
+    subscriptions = []
+    user_ids = set()
+    for stripe_subscription_id, fields in rows:
+        customer = customers.get(fields.pop("stripe_customer_id"))
+        if customer is None:
+            # Customer was not created through this app
+            continue
+        customer_id, user_id = customer
+        user_ids.add(user_id)
+        subscriptions.append(
+            Subscription(
+                stripe_subscription_id=stripe_subscription_id,
+                customer_id=customer_id,
+                **fields,
+            )
+        )
+
+    with transaction.atomic():
+        Subscription.objects.bulk_create(
+            subscriptions,
+            update_conflicts=True,
+            unique_fields=["stripe_subscription_id"],
+            update_fields=UPDATE_FIELDS,
+        )
+        StripeCustomer.objects.filter(
+            pk__in={s.customer_id for s in subscriptions}
+        ).refresh_current_subscription()
+    invalidate_entitlements(user_ids)
+
+    return len(subscriptions)
+
+
+def reconcile_windows(shards):
+    """
+    Split the reconcile range into `shards` `created` windows
+
+    Subscriptions can only belong to customers created by this app, so the
+    oldest local customer bounds the range from below. Window bounds, and
+    so their resume cursors, stay the same from run to run: they are split
+    at day granularity and the last window is left open-ended.
+    """
+    oldest = (
+        StripeCustomer.objects.order_by("created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    )
+    if oldest is None:
+        return []
+
+    day = 60 * 60 * 24
+    created_gte = int(oldest.timestamp()) - day
+    # Split up to the start of today, so boundaries only move once a day
+    created_lt = int(datetime.now(tz=timezone.utc).timestamp()) // day * day
+    windows = split_windows(created_gte, created_lt, shards)
+    windows[-1] = (windows[-1][0], None)
+    return windows
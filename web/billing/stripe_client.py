@@ -0,0 +1,190 @@
+"""
+Shared Stripe HTTP client.
+
+Every Stripe SDK call in the process goes through one pooled `requests`
+session (or, for the SDK's `*_async` methods, one `httpx` async client) with
+connect/read timeouts. Retries are left to the SDK, which backs
+off with jitter and sends an `Idempotency-Key` on retried POSTs. A circuit
+breaker fails calls fast while Stripe is erroring so request threads are not
+tied up waiting on it. Pool and breaker stats are exported to Prometheus.
+"""
+
+import threading
+import time
+
+import httpx
+import requests
+import stripe
+import structlog
+from django.conf import settings
+from metrics.collectors import (
+    track_stripe_request,
+    update_stripe_circuit_state,
+    update_stripe_pool_stats,
+)
+from requests.adapters import HTTPAdapter
+
+logger = structlog.get_logger(__name__)
+
+STRIPE_API_BASE = "https://api.stripe.com"
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+
+class CircuitOpenError(stripe.error.APIConnectionError):
+    """Raised instead of calling Stripe while the circuit breaker is open"""
+
+    def __init__(self):
+        super().__init__(
+            "Stripe is temporarily unavailable (circuit breaker open)",
+            should_retry=False,
+        )
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker
+
+    Opens after `failure_threshold` consecutive failures, rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (another
+    one every `reset_timeout` seconds until a trial reports back).
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            # A trial that never reported back (e.g. its request was
+            # cancelled) is given up on after the same timeout
+            if now - self.opened_at >= self.reset_timeout:
+                self.opened_at = now
+                self._set_state(HALF_OPEN)
+                return
+            raise CircuitOpenError()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                logger.info("Stripe circuit breaker closed")
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        f"Stripe circuit breaker opened after {self.failures} failures"
+                    )
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        update_stripe_circuit_state(state)
+
+
+class PooledStripeClient(stripe.RequestsClient):
+    """Stripe HTTP client with a shared connection pool and circuit breaker"""
+
+    name = "pooled-requests"
+
+    def __init__(self, session, timeout, breaker, async_client=None):
+        super().__init__(
+            timeout=timeout, session=session, async_fallback_client=async_client
+        )
+        self.breaker = breaker
+
+    def request(self, method, url, headers, post_data=None):
+        self.breaker.before_request()
+
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, headers, post_data)
+        except stripe.error.APIConnectionError:
+            self._record(method, start, None)
+            raise
+        finally:
+            self._track_pool()
+
+        self._record(method, start, response[1])
+        return response
+
+    async def request_async(self, method, url, headers, post_data=None):
+        # Async views share the breaker; their connections live in httpx's pool
+        self.breaker.before_request()
+
+        start = time.monotonic()
+        try:
+            response = await super().request_async(method, url, headers, post_data)
+        except stripe.error.APIConnectionError:
+            self._record(method, start, None)
+            raise
+
+        self._record(method, start, response[1])
+        return response
+
+    def _record(self, method, start, status_code):
+        duration = time.monotonic() - start
+        if status_code is None:
+            self.breaker.record_failure()
+            track_stripe_request(method, "connection_error", duration)
+        elif status_code >= 500:
+            self.breaker.record_failure()
+            track_stripe_request(method, "server_error", duration)
+        else:
+            self.breaker.record_success()
+            track_stripe_request(method, str(status_code), duration)
+
+    def _track_pool(self):
+        pools = self._session.get_adapter(STRIPE_API_BASE).poolmanager.pools
+        idle = created = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                idle += pool.pool.qsize() if pool.pool else 0
+                created += pool.num_connections
+        update_stripe_pool_stats(idle=idle, created=created)
+
+
+def build_session():
+    """A requests session whose pool is sized for concurrent request threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.STRIPE_HTTP_POOL_SIZE,
+        pool_block=False,
+    )
+    session.mount(STRIPE_API_BASE, adapter)
+    return session
+
+
+def configure_stripe():
+    """Install the shared client as the Stripe SDK's default HTTP client."""
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = PooledStripeClient(
+        session=build_session(),
+        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+        async_client=stripe.HTTPXClient(
+            timeout=httpx.Timeout(
+                settings.STRIPE_READ_TIMEOUT, connect=settings.STRIPE_CONNECT_TIMEOUT
+            )
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=settings.STRIPE_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.STRIPE_BREAKER_RESET_TIMEOUT,
+        ),
+    )
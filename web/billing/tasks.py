@@ -0,0 +1,239 @@
+from datetime import timedelta
+
+import stripe
+import structlog
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import catalog
+
+logger = structlog.get_logger(__name__)
+
+# Pending events older than this are assumed to have lost their Celery message,
+# and events claimed longer ago than this to have lost their worker
+STALE_WEBHOOK_EVENT_AGE = timedelta(minutes=5)
+
+COALESCE_KEY_PREFIX = "billing:webhook-coalesce"
+
+
+@shared_task
+def warm_price_catalog():
+    """Load active Stripe prices and products into the local catalog."""
+    count = catalog.warm_price_catalog()
+    return f"Cached {count} prices"
+
+
+@shared_task
+def refresh_price(price_id):
+    """Fetch a single Stripe price into the local catalog."""
+    catalog.refresh_price(price_id)
+
+
+@shared_task(
+    autoretry_for=(stripe.error.RateLimitError, stripe.error.APIConnectionError),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=8,
+)
+def reconcile_subscription_window(created_gte=None, created_lt=None):
+    """Reconcile one `created` window; retries resume from the saved cursor."""
+    from .reconcile import reconcile_subscriptions
+
+    count = reconcile_subscriptions(created_gte, created_lt)
+    return f"Reconciled {count} subscriptions"
+
+
+@shared_task
+def reconcile_all_subscriptions(shards=None):
+    """Fan a full Stripe reconcile out over concurrent `created` windows."""
+    from .reconcile import reconcile_windows
+
+    windows = reconcile_windows(shards or settings.BILLING_RECONCILE_SHARDS)
+    for created_gte, created_lt in windows:
+        reconcile_subscription_window.delay(created_gte, created_lt)
+
+    return f"Scheduled {len(windows)} reconcile windows"
+
+
+def _is_coalesced(webhook_event):
+    from .webhook_handlers import SUBSCRIPTION_SYNC_EVENTS
+
+    return (
+        bool(webhook_event.stripe_subscription_id)
+        and webhook_event.type in SUBSCRIPTION_SYNC_EVENTS
+    )
+
+
+def schedule_subscription_sync(stripe_subscription_id):
+    """Schedule one sync per subscription per coalescing window."""
+    window = settings.BILLING_WEBHOOK_COALESCE_WINDOW
+    if cache.add(
+        f"{COALESCE_KEY_PREFIX}:{stripe_subscription_id}", 1, timeout=window * 2
+    ):
+        sync_subscription_events.apply_async(
+            (stripe_subscription_id,), countdown=window
+        )
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def process_webhook_event(self, webhook_event_id):
+    """Run the webhook handler for a stored Stripe event."""
+    from .models import WebhookEvent
+    from .webhook_handlers import webhook_handler
+
+    event = WebhookEvent.objects.filter(pk=webhook_event_id, status="pending").first()
+    if event is None:
+        return
+
+    # Subscription sync events are applied in batches by sync_subscription_events
+    if _is_coalesced(event):
+        schedule_subscription_sync(event.stripe_subscription_id)
+        return
+
+    # Claim the event so duplicate deliveries of this task are no-ops
+    claimed = WebhookEvent.objects.filter(pk=webhook_event_id, status="pending").update(
+        status="processing", attempts=F("attempts") + 1, claimed_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    try:
+        webhook_handler(event.payload)
+    except Exception as e:
+        logger.error(f"Webhook event {event.stripe_event_id} failed: {str(e)}")
+        retries_exhausted = self.request.retries >= self.max_retries
+        WebhookEvent.objects.filter(pk=webhook_event_id).update(
+            status="failed" if retries_exhausted else "pending",
+            last_error=str(e),
+        )
+        if retries_exhausted:
+            return
+        raise self.retry(exc=e)
+
+    WebhookEvent.objects.filter(pk=webhook_event_id).update(
+        status="processed", processed_at=timezone.now(), last_error=""
+    )
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def sync_subscription_events(self, stripe_subscription_id):
+    """Apply all pending sync events for a subscription with one Stripe sync."""
+    from .models import Subscription, WebhookEvent
+    from .webhook_handlers import SUBSCRIPTION_SYNC_EVENTS, handle_subscription_events
+
+    # Events stored from here on schedule a new sync instead of joining this one
+    cache.delete(f"{COALESCE_KEY_PREFIX}:{stripe_subscription_id}")
+
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                stripe_subscription_id=stripe_subscription_id,
+                type__in=SUBSCRIPTION_SYNC_EVENTS,
+                status="pending",
+            )
+            .order_by("stripe_created")
+        )
+        WebhookEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+            status="processing",
+            attempts=F("attempts") + 1,
+            claimed_at=timezone.now(),
+        )
+
+    if not events:
+        return
+
+    # Discard events older than the last one applied to this subscription.
+    # Stripe timestamps have one-second resolution, so an event from the same
+    # second as the cancellation is discarded too: cancellation is final.
+    last_applied, status = (
+        Subscription.objects.filter(stripe_subscription_id=stripe_subscription_id)
+        .values_list("last_event_created", "status")
+        .first()
+    ) or (None, None)
+    stale = [
+        e
+        for e in events
+        if last_applied
+        and e.stripe_created
+        and (
+            e.stripe_created < last_applied
+            or (e.stripe_created == last_applied and status == "canceled")
+        )
+    ]
+    fresh = [e for e in events if e not in stale]
+
+    now = timezone.now()
+    if stale:
+        WebhookEvent.objects.filter(pk__in=[e.pk for e in stale]).update(
+            status="skipped", processed_at=now
+        )
+    if not fresh:
+        return
+
+    fresh_ids = [e.pk for e in fresh]
+    try:
+        handle_subscription_events(stripe_subscription_id, [e.payload for e in fresh])
+    except Exception as e:
+        logger.error(
+            f"Coalesced sync for subscription {stripe_subscription_id} failed: {str(e)}"
+        )
+        retries_exhausted = self.request.retries >= self.max_retries
+        WebhookEvent.objects.filter(pk__in=fresh_ids).update(
+            status="failed" if retries_exhausted else "pending",
+            last_error=str(e),
+        )
+        if retries_exhausted:
+            return
+        raise self.retry(exc=e)
+
+    created = [e.stripe_created for e in fresh if e.stripe_created]
+    if created:
+        newest = max(created)
+        Subscription.objects.filter(
+            Q(last_event_created__isnull=True) | Q(last_event_created__lt=newest),
+            stripe_subscription_id=stripe_subscription_id,
+        ).update(last_event_created=newest)
+    WebhookEvent.objects.filter(pk__in=fresh_ids).update(
+        status="processed", processed_at=now, last_error=""
+    )
+
+
+@shared_task
+def process_pending_webhook_events():
+    """Re-enqueue stored webhook events whose processing task never ran."""
+    from .models import WebhookEvent
+
+    cutoff = timezone.now() - STALE_WEBHOOK_EVENT_AGE
+
+    # A worker that died mid-event leaves its claim behind, and the redelivered
+    # task skips events that aren't pending, so release the claim
+    reclaimed = WebhookEvent.objects.filter(
+        Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True),
+        status="processing",
+        received_at__lt=cutoff,
+    ).update(status="pending")
+    if reclaimed:
+        logger.warning(f"Released {reclaimed} stale webhook event claims")
+
+    events = list(
+        WebhookEvent.objects.filter(status="pending", received_at__lt=cutoff).only(
+            "pk", "type", "stripe_subscription_id"
+        )
+    )
+
+    subscription_ids = set()
+    for event in events:
+        if _is_coalesced(event):
+            subscription_ids.add(event.stripe_subscription_id)
+        else:
+            process_webhook_event.delay(event.pk)
+
+    for stripe_subscription_id in subscription_ids:
+        sync_subscription_events.delay(stripe_subscription_id)
+
+    return f"Re-enqueued {len(events)} webhook events"
@@ -0,0 +1,414 @@
+"""
+Offline stand-in for the Stripe API.
+
+`FakeStripe` is a `stripe.HTTPClient` that serves Customers, Products,
+Prices, Subscriptions, Checkout Sessions and Billing Portal Sessions from
+memory, so the real SDK code paths in `billing` run without network access.
+Latency and error injection are configurable, and every request is recorded
+so tests can assert how many Stripe calls a code path makes.
+
+`signed_webhook` builds payloads and `Stripe-Signature` headers that pass
+`stripe.Webhook.construct_event`, and `replay_webhooks` posts them at the
+`stripe_webhook` view.
+
+Usage:
+    with fake_stripe(latency=0.2) as fake:
+        price = fake.add_price("Pro", 1000)
+        ...
+"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlsplit
+
+import stripe
+from django.test import override_settings
+from django.urls import reverse
+
+API_KEY = "sk_test_fake"
+WEBHOOK_SECRET = "whsec_fake"
+
+ERROR_TYPES = {
+    400: "invalid_request_error",
+    404: "invalid_request_error",
+    429: "rate_limit_error",
+    500: "api_error",
+}
+
+
+def decode_form(data):
+    """Decode Stripe's bracketed form encoding into nested dicts and lists"""
+    decoded = {}
+    for key, value in parse_qsl(data or "", keep_blank_values=True):
+        parts = re.findall(r"[^\[\]]+", key)
+        target = decoded
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return _listify(decoded)
+
+
+def _listify(value):
+    if not isinstance(value, dict):
+        return value
+    if value and all(key.isdigit() for key in value):
+        return [_listify(value[key]) for key in sorted(value, key=int)]
+    return {key: _listify(item) for key, item in value.items()}
+
+
+def _bool(value):
+    return value in (True, "true", "True", "1")
+
+
+class FakeStripe(stripe.HTTPClient):
+    """In-memory Stripe API served through the SDK's HTTP client hook"""
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=500, seed=None):
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+
+        self.customers = {}
+        self.products = {}
+        self.prices = {}
+        self.subscriptions = {}
+        self.checkout_sessions = {}
+        self.requests = []
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self.routes = [
+            ("post", r"/v1/customers", self.create_customer),
+            ("get", r"/v1/customers/(?P<id>[^/]+)", self.retrieve_customer),
+            ("get", r"/v1/products/(?P<id>[^/]+)", self.retrieve_product),
+            ("get", r"/v1/prices", self.list_prices),
+            ("get", r"/v1/prices/(?P<id>[^/]+)", self.retrieve_price),
+            ("get", r"/v1/subscriptions", self.list_subscriptions),
+            ("post", r"/v1/subscriptions", self.create_subscription),
+            ("get", r"/v1/subscriptions/(?P<id>[^/]+)", self.retrieve_subscription),
+            ("post", r"/v1/subscriptions/(?P<id>[^/]+)", self.update_subscription),
+            ("delete", r"/v1/subscriptions/(?P<id>[^/]+)", self.cancel_subscription),
+            ("post", r"/v1/checkout/sessions", self.create_checkout_session),
+            ("post", r"/v1/billing_portal/sessions", self.create_portal_session),
+        ]
+
+    # HTTP client interface
+
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.handle(method, url, post_data)
+
+    async def request_async(self, method, url, headers, post_data=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.handle(method, url, post_data)
+
+    def handle(self, method, url, post_data):
+        parsed = urlsplit(url)
+        params = decode_form(parsed.query if method == "get" else post_data)
+
+        with self._lock:
+            self.requests.append((method.upper(), parsed.path))
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error(self.error_status, "Injected failure")
+
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, parsed.path)
+            if route_method == method and match:
+                with self._lock:
+                    return handler(params, **match.groupdict())
+
+        return self.error(
+            404, f"Unrecognized request URL ({method.upper()}: {parsed.path})"
+        )
+
+    def sleep_async(self, secs):
+        return asyncio.sleep(secs)
+
+    def request_stream(self, method, url, headers, post_data=None, *, _usage=None):
+        raise NotImplementedError("FakeStripe does not serve streaming requests")
+
+    def close(self):
+        pass
+
+    # Helpers
+
+    def new_id(self, prefix):
+        return f"{prefix}_fake{next(self._ids):08d}"
+
+    def count(self, method, path_prefix):
+        """Number of recorded requests for a method and path prefix"""
+        return sum(
+            1
+            for request_method, path in self.requests
+            if request_method == method and path.startswith(path_prefix)
+        )
+
+    def respond(self, body, status=200):
+        return json.dumps(body), status, {"request-id": self.new_id("req")}
+
+    def error(self, status, message):
+        return self.respond(
+            {
+                "error": {
+                    "type": ERROR_TYPES.get(status, "api_error"),
+                    "message": message,
+                }
+            },
+            status,
+        )
+
+    def not_found(self, resource, resource_id):
+        return self.error(404, f"No such {resource}: '{resource_id}'")
+
+    def list_response(self, objects, params, url):
+        objects = list(reversed(objects))  # Newest first, like Stripe
+        if params.get("starting_after"):
+            ids = [obj["id"] for obj in objects]
+            objects = objects[ids.index(params["starting_after"]) + 1 :]
+
+        limit = int(params.get("limit", 10))
+        return self.respond(
+            {
+                "object": "list",
+                "url": url,
+                "has_more": len(objects) > limit,
+                "data": objects[:limit],
+            }
+        )
+
+    def expand_price(self, price, expand):
+        if "product" in expand:
+            return {**price, "product": self.products[price["product"]]}
+        return price
+
+    # Seeding
+
+    def add_price(self, product_name="Pro", unit_amount=1000, interval="month"):
+        """Create a product and a recurring price for it"""
+        product = {
+            "id": self.new_id("prod"),
+            "object": "product",
+            "name": product_name,
+            "active": True,
+        }
+        price = {
+            "id": self.new_id("price"),
+            "object": "price",
+            "product": product["id"],
+            "active": True,
+            "currency": "usd",
+            "unit_amount": unit_amount,
+            "recurring": {"interval": interval, "interval_count": 1},
+        }
+        self.products[product["id"]] = product
+        self.prices[price["id"]] = price
+        return price
+
+    def add_subscription(self, customer_id, price_id, status="active", **fields):
+        """Create a subscription without going through the API"""
+        now = int(time.time())
+        subscription = {
+            "id": self.new_id("sub"),
+            "object": "subscription",
+            "customer": customer_id,
+            "status": status,
+            "cancel_at_period_end": False,
+            "created": now,
+            "current_period_start": now,
+            "current_period_end": now + 30 * 24 * 60 * 60,
+            "trial_end": None,
+            "metadata": {},
+            "items": {
+                "object": "list",
+                "data": [
+                    {
+                        "id": self.new_id("si"),
+                        "object": "subscription_item",
+                        "price": self.prices[price_id],
+                        "quantity": 1,
+                    }
+                ],
+            },
+            **fields,
+        }
+        self.subscriptions[subscription["id"]] = subscription
+        return subscription
+
+    # Routes
+
+    def create_customer(self, params):
+        customer = {
+            "id": self.new_id("cus"),
+            "object": "customer",
+            "email": params.get("email"),
+            "metadata": params.get("metadata", {}),
+            "created": int(time.time()),
+        }
+        self.customers[customer["id"]] = customer
+        return self.respond(customer)
+
+    def retrieve_customer(self, params, id):
+        if id not in self.customers:
+            return self.not_found("customer", id)
+        return self.respond(self.customers[id])
+
+    def retrieve_product(self, params, id):
+        if id not in self.products:
+            return self.not_found("product", id)
+        return self.respond(self.products[id])
+
+    def retrieve_price(self, params, id):
+        if id not in self.prices:
+            return self.not_found("price", id)
+        return self.respond(
+            self.expand_price(self.prices[id], params.get("expand", []))
+        )
+
+    def list_prices(self, params):
+        expand = [item.removeprefix("data.") for item in params.get("expand", [])]
+        prices = [
+            self.expand_price(price, expand)
+            for price in self.prices.values()
+            if "active" not in params or price["active"] == _bool(params["active"])
+        ]
+        return self.list_response(prices, params, "/v1/prices")
+
+    def list_subscriptions(self, params):
+        status = params.get("status")
+        created = params.get("created", {})
+        subscriptions = [
+            subscription
+            for subscription in self.subscriptions.values()
+            if (
+                status == "all"
+                or subscription["status"] == status
+                or (status is None and subscription["status"] != "canceled")
+            )
+            and subscription["created"] >= int(created.get("gte", 0))
+            and subscription["created"] < int(created.get("lt", 2**63))
+        ]
+        return self.list_response(subscriptions, params, "/v1/subscriptions")
+
+    def create_subscription(self, params):
+        if params.get("customer") not in self.customers:
+            return self.not_found("customer", params.get("customer"))
+        price_id = params["items"][0]["price"]
+        if price_id not in self.prices:
+            return self.not_found("price", price_id)
+        return self.respond(self.add_subscription(params["customer"], price_id))
+
+    def retrieve_subscription(self, params, id):
+        if id not in self.subscriptions:
+            return self.not_found("subscription", id)
+        return self.respond(self.subscriptions[id])
+
+    def update_subscription(self, params, id):
+        if id not in self.subscriptions:
+            return self.not_found("subscription", id)
+        subscription = self.subscriptions[id]
+        if "cancel_at_period_end" in params:
+            subscription["cancel_at_period_end"] = _bool(params["cancel_at_period_end"])
+        return self.respond(subscription)
+
+    def cancel_subscription(self, params, id):
+        if id not in self.subscriptions:
+            return self.not_found("subscription", id)
+        self.subscriptions[id]["status"] = "canceled"
+        return self.respond(self.subscriptions[id])
+
+    def create_checkout_session(self, params):
+        session = {
+            "id": self.new_id("cs"),
+            "object": "checkout.session",
+            "customer": params.get("customer"),
+            "mode": params.get("mode"),
+            "metadata": params.get("metadata", {}),
+            "subscription": None,
+        }
+        session["url"] = f"https://checkout.stripe.test/{session['id']}"
+        self.checkout_sessions[session["id"]] = session
+        return self.respond(session)
+
+    def create_portal_session(self, params):
+        session_id = self.new_id("bps")
+        return self.respond(
+            {
+                "id": session_id,
+                "object": "billing_portal.session",
+                "customer": params.get("customer"),
+                "url": f"https://billing.stripe.test/{session_id}",
+            }
+        )
+
+    # Webhooks
+
+    def event(self, event_type, obj, created=None):
+        """Build a Stripe event wrapping a copy of `obj`"""
+        return {
+            "id": self.new_id("evt"),
+            "object": "event",
+            "type": event_type,
+            "created": created or int(time.time()),
+            "livemode": False,
+            "data": {"object": json.loads(json.dumps(obj))},
+        }
+
+
+def signed_webhook(event, secret=WEBHOOK_SECRET, timestamp=None):
+    """Return a webhook payload and a matching Stripe-Signature header"""
+    payload = json.dumps(event)
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return payload, f"t={timestamp},v1={signature}"
+
+
+def replay_webhooks(client, events, secret=WEBHOOK_SECRET):
+    """POST signed events at the webhook view; returns the response codes"""
+    url = reverse("billing:webhook")
+    status_codes = []
+    for event in events:
+        payload, signature = signed_webhook(event, secret)
+        response = client.post(
+            url,
+            data=payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=signature,
+        )
+        status_codes.append(response.status_code)
+    return status_codes
+
+
+@contextmanager
+def fake_stripe(**kwargs):
+    """Route all Stripe SDK calls to a FakeStripe for the duration"""
+    fake = FakeStripe(**kwargs)
+    previous = (stripe.default_http_client, stripe.api_key, stripe.max_network_retries)
+
+    stripe.default_http_client = fake
+    stripe.api_key = API_KEY
+    stripe.max_network_retries = 0
+    try:
+        with override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET):
+            yield fake
+    finally:
+        stripe.default_http_client, stripe.api_key, stripe.max_network_retries = (
+            previous
+        )
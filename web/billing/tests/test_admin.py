@@ -0,0 +1,45 @@
+from billing.models import StripeCustomer, Subscription
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class BillingAdminQueryCountTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser("admin@example.com", "password")
+        self.client.force_login(admin)
+
+    def add_subscriptions(self, count):
+        start = Subscription.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(f"user{i}@example.com", "password")
+            customer = StripeCustomer.objects.create(
+                user=user, stripe_customer_id=f"cus_{i}"
+            )
+            Subscription.objects.create(
+                customer=customer,
+                stripe_subscription_id=f"sub_{i}",
+                stripe_price_id="price_test",
+                status="active",
+                current_period_end=timezone.now(),
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        for name in ["stripecustomer", "subscription"]:
+            with self.subTest(name):
+                url = reverse(f"admin:billing_{name}_changelist")
+                self.add_subscriptions(2)
+                baseline = self.count_queries(url)
+                self.add_subscriptions(10)
+                self.assertEqual(self.count_queries(url), baseline)
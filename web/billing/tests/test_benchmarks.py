@@ -0,0 +1,100 @@
+"""
+Billing load benchmarks against the offline Stripe stand-in.
+
+Skipped unless BILLING_BENCHMARKS is set, e.g.:
+
+    BILLING_BENCHMARKS=1 python manage.py test billing.tests.test_benchmarks
+
+BILLING_BENCHMARK_REQUESTS sets the number of requests per benchmark and
+BILLING_BENCHMARK_STRIPE_LATENCY the simulated Stripe latency in seconds.
+"""
+
+import os
+import statistics
+import time
+import unittest
+from unittest import mock
+
+from billing.catalog import warm_price_catalog
+from billing.models import StripeCustomer, WebhookEvent
+from billing.utils import upsert_subscription
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .fake_stripe import fake_stripe, replay_webhooks
+
+User = get_user_model()
+
+REQUESTS = int(os.environ.get("BILLING_BENCHMARK_REQUESTS", "1000"))
+STRIPE_LATENCY = float(os.environ.get("BILLING_BENCHMARK_STRIPE_LATENCY", "0.05"))
+
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100)[pct - 1]
+
+
+def report(name, samples):
+    print(
+        f"\n{name}: n={len(samples)} "
+        f"p50={percentile(samples, 50) * 1000:.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:.2f}ms"
+    )
+
+
+@unittest.skipUnless(os.environ.get("BILLING_BENCHMARKS"), "BILLING_BENCHMARKS not set")
+class BillingBenchmarks(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        context = fake_stripe(latency=STRIPE_LATENCY)
+        self.fake = context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.user = User.objects.create_user("bench@example.com", "password")
+        StripeCustomer.objects.create(user=self.user, stripe_customer_id="cus_bench")
+        self.fake.customers["cus_bench"] = {"id": "cus_bench", "object": "customer"}
+        self.price = self.fake.add_price("Pro", 1000)
+        self.client.force_login(self.user)
+
+    def test_webhook_ingestion_throughput(self):
+        subscription = self.fake.add_subscription("cus_bench", self.price["id"])
+        events = [
+            self.fake.event("customer.subscription.updated", subscription)
+            for _ in range(REQUESTS)
+        ]
+
+        with mock.patch("billing.views.process_webhook_event"):
+            start = time.perf_counter()
+            status_codes = replay_webhooks(self.client, events)
+            elapsed = time.perf_counter() - start
+
+        print(f"\nwebhook ingestion: {REQUESTS / elapsed:.0f} events/s")
+        self.assertEqual(set(status_codes), {200})
+        self.assertEqual(WebhookEvent.objects.count(), REQUESTS)
+
+    def test_status_endpoint_latency(self):
+        upsert_subscription(self.fake.add_subscription("cus_bench", self.price["id"]))
+        warm_price_catalog()
+
+        samples = []
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            response = self.client.get(reverse("billing:status"))
+            samples.append(time.perf_counter() - start)
+            self.assertEqual(response.status_code, 200)
+
+        report("status endpoint", samples)
+
+    def test_checkout_latency(self):
+        samples = []
+        for _ in range(min(REQUESTS, 100)):
+            start = time.perf_counter()
+            response = self.client.post(
+                reverse("billing:checkout"), {"price_id": self.price["id"]}
+            )
+            samples.append(time.perf_counter() - start)
+            self.assertEqual(response.status_code, 200)
+
+        report("checkout", samples)
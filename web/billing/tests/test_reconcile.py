@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from billing.models import StripeCustomer
+from billing.reconcile import reconcile_windows
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+User = get_user_model()
+
+
+class ReconcileWindowsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("customer@example.com", "password")
+        customer = StripeCustomer.objects.create(user=user, stripe_customer_id="cus_1")
+        StripeCustomer.objects.filter(pk=customer.pk).update(
+            created_at=datetime(2025, 1, 1, tzinfo=timezone.utc)
+        )
+
+    def windows_at(self, now):
+        with mock.patch("billing.reconcile.datetime") as mock_datetime:
+            mock_datetime.now.return_value = now
+            return reconcile_windows(4)
+
+    def test_windows_are_stable_between_runs(self):
+        now = datetime(2026, 6, 1, 9, tzinfo=timezone.utc)
+
+        windows = self.windows_at(now)
+
+        self.assertEqual(len(windows), 4)
+        self.assertEqual(windows, self.windows_at(now + timedelta(hours=1)))
+        # The tail window is open-ended, so newer subscriptions are included
+        self.assertIsNone(windows[-1][1])
+        for (_, upper), (lower, _) in zip(windows, windows[1:]):
+            self.assertEqual(upper, lower)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+import stripe
+from billing.stripe_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PooledStripeClient,
+    build_session,
+)
+from django.test import SimpleTestCase
+
+
+class PooledStripeClientTest(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        self.client = PooledStripeClient(
+            session=build_session(), timeout=(1, 1), breaker=self.breaker
+        )
+
+    def request(self, status_code):
+        with mock.patch.object(
+            stripe.RequestsClient, "request", return_value=("{}", status_code, {})
+        ) as request:
+            try:
+                self.client.request("get", "https://api.stripe.com/v1/prices", {})
+            except CircuitOpenError:
+                pass
+        return request.call_count
+
+    def test_breaker_opens_after_consecutive_server_errors(self):
+        self.request(500)
+        self.request(500)
+
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            self.client.request("get", "https://api.stripe.com/v1/prices", {})
+
+    def test_success_resets_failure_count(self):
+        self.request(500)
+        self.request(200)
+        self.request(500)
+
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_trial_request_after_reset_timeout_closes_breaker(self):
+        self.request(500)
+        self.request(500)
+
+        with mock.patch("billing.stripe_client.time.monotonic", return_value=1e12):
+            self.assertEqual(self.request(200), 1)
+
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_abandoned_trial_is_retried_after_reset_timeout(self):
+        self.request(500)
+        self.request(500)
+
+        with mock.patch("billing.stripe_client.time.monotonic", return_value=1e12):
+            # The trial call is let through but never reports back
+            self.breaker.before_request()
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.before_request()
+
+        with mock.patch("billing.stripe_client.time.monotonic", return_value=1e12 + 30):
+            self.assertEqual(self.request(200), 1)
+
+        self.assertEqual(self.breaker.state, "closed")
@@ -0,0 +1,74 @@
+from billing.models import StripeCustomer, Subscription
+from billing.utils import upsert_subscription
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .fake_stripe import fake_stripe
+
+User = get_user_model()
+
+
+class BillingViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        context = fake_stripe()
+        self.fake = context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.user = User.objects.create_user("customer@example.com", "password")
+        self.price = self.fake.add_price("Pro", 1000)
+        self.client.force_login(self.user)
+
+    def subscribe(self):
+        customer = StripeCustomer.objects.create(
+            user=self.user, stripe_customer_id="cus_test"
+        )
+        self.fake.customers["cus_test"] = {"id": "cus_test", "object": "customer"}
+        return upsert_subscription(
+            self.fake.add_subscription(customer.stripe_customer_id, self.price["id"])
+        )
+
+    def test_checkout_creates_customer_and_session(self):
+        response = self.client.post(
+            reverse("billing:checkout"), {"price_id": self.price["id"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("checkout.stripe.test", response.json()["checkout_url"])
+        self.assertTrue(StripeCustomer.objects.filter(user=self.user).exists())
+
+    def test_checkout_rejects_existing_subscriber(self):
+        self.subscribe()
+
+        response = self.client.post(
+            reverse("billing:checkout"), {"price_id": self.price["id"]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancel_and_reactivate(self):
+        subscription = self.subscribe()
+
+        response = self.client.post(reverse("billing:cancel"))
+        self.assertEqual(response.status_code, 200)
+        subscription.refresh_from_db()
+        self.assertTrue(subscription.cancel_at_period_end)
+        self.assertTrue(
+            self.fake.subscriptions[subscription.stripe_subscription_id][
+                "cancel_at_period_end"
+            ]
+        )
+
+        response = self.client.post(reverse("billing:reactivate"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            Subscription.objects.get(pk=subscription.pk).cancel_at_period_end
+        )
+
+    def test_portal_without_customer_returns_404(self):
+        response = self.client.post(reverse("billing:portal"))
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,242 @@
+from unittest import mock
+
+from billing.catalog import warm_price_catalog
+from billing.models import StripeCustomer, Subscription, WebhookEvent
+from billing.tasks import (
+    STALE_WEBHOOK_EVENT_AGE,
+    process_pending_webhook_events,
+    process_webhook_event,
+    sync_subscription_events,
+)
+from celeryapp import celery_app
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .fake_stripe import fake_stripe, replay_webhooks
+
+User = get_user_model()
+
+
+class WebhookTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+
+        context = fake_stripe()
+        self.fake = context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.user = User.objects.create_user("subscriber@example.com", "password")
+        self.customer = StripeCustomer.objects.create(
+            user=self.user, stripe_customer_id="cus_test"
+        )
+        self.fake.customers["cus_test"] = {"id": "cus_test", "object": "customer"}
+        self.price = self.fake.add_price("Team", 2500)
+        self.subscription = self.fake.add_subscription("cus_test", self.price["id"])
+
+
+class StripeWebhookViewTest(WebhookTestCase):
+    def test_invalid_signature_is_rejected(self):
+        response = self.client.post(
+            reverse("billing:webhook"),
+            data="{}",
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE="t=1,v1=bad",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_duplicate_event_is_stored_once(self):
+        event = self.fake.event("customer.subscription.updated", self.subscription)
+
+        self.assertEqual(replay_webhooks(self.client, [event, event]), [200, 200])
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_subscription_event_is_applied_without_fetching(self):
+        event = self.fake.event("customer.subscription.updated", self.subscription)
+
+        replay_webhooks(self.client, [event])
+
+        subscription = Subscription.objects.get(
+            stripe_subscription_id=self.subscription["id"]
+        )
+        self.assertEqual(subscription.status, "active")
+        self.assertEqual(subscription.stripe_price_id, self.price["id"])
+        self.assertEqual(self.fake.count("GET", "/v1/subscriptions"), 0)
+        self.assertEqual(
+            WebhookEvent.objects.get(stripe_event_id=event["id"]).status, "processed"
+        )
+
+
+class WebhookHandlerErrorTest(WebhookTestCase):
+    def test_handler_error_is_retried_not_marked_processed(self):
+        event = self.fake.event("price.updated", self.price)
+        with mock.patch("billing.views.process_webhook_event"):
+            replay_webhooks(self.client, [event])
+        webhook_event = WebhookEvent.objects.get(stripe_event_id=event["id"])
+
+        with mock.patch(
+            "billing.catalog.store_price", side_effect=RuntimeError("DB down")
+        ):
+            process_webhook_event.apply((webhook_event.pk,))
+
+        webhook_event.refresh_from_db()
+        self.assertEqual(webhook_event.status, "failed")
+        self.assertEqual(webhook_event.last_error, "DB down")
+        self.assertEqual(webhook_event.attempts, process_webhook_event.max_retries + 1)
+
+
+class SubscriptionEventCoalescingTest(WebhookTestCase):
+    def store_events(self, events):
+        with mock.patch("billing.views.process_webhook_event"):
+            replay_webhooks(self.client, events)
+
+    def test_renewal_burst_costs_one_stripe_fetch(self):
+        invoice = {"id": "in_test", "subscription": self.subscription["id"]}
+        self.store_events(
+            [
+                self.fake.event("invoice.payment_succeeded", invoice),
+                self.fake.event("invoice.payment_succeeded", invoice),
+                self.fake.event("invoice.payment_failed", invoice),
+            ]
+        )
+
+        sync_subscription_events(self.subscription["id"])
+
+        self.assertEqual(self.fake.count("GET", "/v1/subscriptions"), 1)
+        self.assertEqual(WebhookEvent.objects.filter(status="processed").count(), 3)
+
+    def test_events_older_than_last_applied_are_skipped(self):
+        newer = self.fake.event(
+            "customer.subscription.updated", self.subscription, created=2_000_000_000
+        )
+        self.store_events([newer])
+        sync_subscription_events(self.subscription["id"])
+
+        older = self.fake.event(
+            "customer.subscription.updated",
+            {**self.subscription, "status": "past_due"},
+            created=1_900_000_000,
+        )
+        self.store_events([older])
+        sync_subscription_events(self.subscription["id"])
+
+        self.assertEqual(
+            Subscription.objects.get(
+                stripe_subscription_id=self.subscription["id"]
+            ).status,
+            "active",
+        )
+        self.assertEqual(
+            WebhookEvent.objects.get(stripe_event_id=older["id"]).status, "skipped"
+        )
+
+    def test_update_from_the_second_of_cancellation_is_skipped(self):
+        created = self.fake.event(
+            "customer.subscription.created", self.subscription, created=2_000_000_000
+        )
+        self.store_events([created])
+        sync_subscription_events(self.subscription["id"])
+
+        deleted = self.fake.event(
+            "customer.subscription.deleted",
+            {**self.subscription, "status": "canceled"},
+            created=2_000_000_100,
+        )
+        with mock.patch("billing.views.process_webhook_event"):
+            replay_webhooks(self.client, [deleted])
+        process_webhook_event(
+            WebhookEvent.objects.get(stripe_event_id=deleted["id"]).pk
+        )
+
+        updated = self.fake.event(
+            "customer.subscription.updated", self.subscription, created=2_000_000_100
+        )
+        self.store_events([updated])
+        sync_subscription_events(self.subscription["id"])
+
+        subscription = Subscription.objects.get(
+            stripe_subscription_id=self.subscription["id"]
+        )
+        self.assertEqual(subscription.status, "canceled")
+        self.assertEqual(
+            WebhookEvent.objects.get(stripe_event_id=updated["id"]).status, "skipped"
+        )
+
+
+class PendingWebhookSweepTest(WebhookTestCase):
+    def test_claim_lost_with_worker_is_released(self):
+        event = self.fake.event("customer.subscription.updated", self.subscription)
+        with mock.patch("billing.views.process_webhook_event"):
+            replay_webhooks(self.client, [event])
+        # As left by a worker that died after claiming the event
+        long_ago = timezone.now() - STALE_WEBHOOK_EVENT_AGE * 2
+        WebhookEvent.objects.update(
+            status="processing", claimed_at=long_ago, received_at=long_ago
+        )
+
+        process_pending_webhook_events()
+
+        self.assertEqual(WebhookEvent.objects.get().status, "processed")
+        self.assertTrue(
+            Subscription.objects.filter(
+                stripe_subscription_id=self.subscription["id"]
+            ).exists()
+        )
+
+    def test_recent_claim_is_left_alone(self):
+        event = self.fake.event("customer.subscription.updated", self.subscription)
+        with mock.patch("billing.views.process_webhook_event"):
+            replay_webhooks(self.client, [event])
+        long_ago = timezone.now() - STALE_WEBHOOK_EVENT_AGE * 2
+        WebhookEvent.objects.update(
+            status="processing", claimed_at=timezone.now(), received_at=long_ago
+        )
+
+        process_pending_webhook_events()
+
+        self.assertEqual(WebhookEvent.objects.get().status, "processing")
+
+
+class SubscriptionStatusViewTest(WebhookTestCase):
+    def test_status_does_not_call_stripe(self):
+        replay_webhooks(
+            self.client,
+            [self.fake.event("customer.subscription.created", self.subscription)],
+        )
+        warm_price_catalog()
+        requests_before = len(self.fake.requests)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("billing:status"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["plan_name"], "Team")
+        self.assertEqual(len(self.fake.requests), requests_before)
+
+
+class CurrentSubscriptionTest(WebhookTestCase):
+    def test_customer_tracks_current_subscription(self):
+        replay_webhooks(
+            self.client,
+            [self.fake.event("customer.subscription.created", self.subscription)],
+        )
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.entitlement_status, "active")
+        self.assertEqual(
+            self.customer.current_subscription.stripe_subscription_id,
+            self.subscription["id"],
+        )
+
+        replay_webhooks(
+            self.client,
+            [self.fake.event("customer.subscription.deleted", self.subscription)],
+        )
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.entitlement_status, "none")
+        self.assertIsNone(self.customer.current_subscription)
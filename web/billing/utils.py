@@ -2,14 +2,14 @@ from datetime import datetime, timezone
 
 import stripe
 import structlog
-from django.conf import settings
+from django.db import transaction
 
+from .cache import get_entitlement, refresh_entitlement
+from .catalog import DEFAULT_PLAN_NAME, get_plan_name
 from .models import StripeCustomer, Subscription
 
 logger = structlog.get_logger(__name__)
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 
 def get_or_create_stripe_customer(user):
     """Get or create a Stripe customer for a Django user"""
@@ -34,27 +34,42 @@ def get_or_create_stripe_customer(user):
         return customer
 
 
+async def aget_or_create_stripe_customer(user):
+    """Async version of `get_or_create_stripe_customer`"""
+    try:
+        return await StripeCustomer.objects.aget(user=user)
+    except StripeCustomer.DoesNotExist:
+        # Create customer in Stripe
+        stripe_customer = await stripe.Customer.create_async(
+            email=user.email,
+            metadata={
+                "user_id": str(user.id),
+            },
+        )
+
+        # Create customer in database
+        customer = await StripeCustomer.objects.acreate(
+            user=user,
+            stripe_customer_id=stripe_customer.id,
+        )
+
+        logger.info(f"Created Stripe customer {stripe_customer.id} for user {user.id}")
+        return customer
+
+
 def get_user_subscription_status(user):
     """Get detailed subscription status for a user"""
     try:
-        customer = user.stripe_customer
+        customer = StripeCustomer.objects.select_related("current_subscription").get(
+            user=user
+        )
         subscription = customer.active_subscription
 
         if subscription:
-            # Get plan name from Stripe price if available
-            plan_name = "Pro"  # Default
+            # Plan name comes from the local price catalog, never from Stripe
+            plan_name = DEFAULT_PLAN_NAME
             if subscription.stripe_price_id:
-                try:
-                    price = stripe.Price.retrieve(
-                        subscription.stripe_price_id, expand=["product"]
-                    )
-                    product = price.get("product", {})
-                    if isinstance(product, dict):
-                        plan_name = product.get("name", "Pro")
-                    elif hasattr(product, "name"):
-                        plan_name = product.name
-                except Exception:
-                    pass  # Use default plan name
+                plan_name = get_plan_name(subscription.stripe_price_id)
 
             return {
                 "has_active_subscription": True,
@@ -86,56 +101,104 @@ def sync_subscription_from_stripe(stripe_subscription_id):
         stripe_sub = stripe.Subscription.retrieve(
             stripe_subscription_id, expand=["items.data.price"]
         )
+        return upsert_subscription(stripe_sub)
 
-        # Use dict access consistently for Stripe API v11+
-        customer_id = stripe_sub.get("customer") or stripe_sub.customer
-        customer = StripeCustomer.objects.get(stripe_customer_id=customer_id)
-
-        # Extract price ID
-        price_id = ""
-        items_data = stripe_sub.get("items", {}).get("data", [])
-        if items_data:
-            price_id = items_data[0].get("price", {}).get("id", "")
-
-        # Get status and other fields with fallbacks
-        status = stripe_sub.get("status") or stripe_sub.status
-        cancel_at_period_end = stripe_sub.get("cancel_at_period_end", False)
-        current_period_end_ts = (
-            stripe_sub.get("current_period_end") or stripe_sub.current_period_end
-        )
-        trial_end_ts = stripe_sub.get("trial_end")
+    except stripe.error.StripeError as e:
+        logger.error(f"Stripe error syncing subscription: {str(e)}")
+        raise
+    except StripeCustomer.DoesNotExist:
+        logger.error(f"Customer not found for subscription {stripe_subscription_id}")
+        raise
 
-        # Convert timestamps
-        current_period_end = datetime.fromtimestamp(
-            current_period_end_ts, tz=timezone.utc
-        )
-        trial_end = None
-        if trial_end_ts:
-            trial_end = datetime.fromtimestamp(trial_end_ts, tz=timezone.utc)
 
+def apply_subscription_payload(stripe_sub):
+    """
+    Upsert a subscription from a webhook event's subscription object
+
+    Falls back to fetching the subscription from Stripe when the object is
+    missing any field the local row needs.
+    """
+    if not has_subscription_fields(stripe_sub):
+        logger.info(f"Incomplete subscription payload, fetching {stripe_sub['id']}")
+        return sync_subscription_from_stripe(stripe_sub["id"])
+
+    try:
+        return upsert_subscription(stripe_sub)
+    except StripeCustomer.DoesNotExist:
+        logger.error(f"Customer not found for subscription {stripe_sub['id']}")
+        raise
+
+
+def has_subscription_fields(stripe_sub):
+    """Check a subscription object has everything upsert_subscription reads"""
+    items_data = (stripe_sub.get("items") or {}).get("data") or []
+    return bool(
+        stripe_sub.get("customer")
+        and stripe_sub.get("status")
+        and stripe_sub.get("current_period_end")
+        and items_data
+        and isinstance(items_data[0].get("price"), dict)
+        and items_data[0]["price"].get("id")
+    )
+
+
+def parse_stripe_subscription(stripe_sub):
+    """Extract the fields we store from a Stripe subscription object"""
+    # Use dict access consistently for Stripe API v11+
+    customer_id = stripe_sub.get("customer") or stripe_sub.customer
+
+    # Extract price ID
+    price_id = ""
+    items_data = stripe_sub.get("items", {}).get("data", [])
+    if items_data:
+        price_id = items_data[0].get("price", {}).get("id", "")
+
+    # Get status and other fields with fallbacks
+    status = stripe_sub.get("status") or stripe_sub.status
+    cancel_at_period_end = stripe_sub.get("cancel_at_period_end", False)
+    current_period_end_ts = (
+        stripe_sub.get("current_period_end") or stripe_sub.current_period_end
+    )
+    trial_end_ts = stripe_sub.get("trial_end")
+
+    # Convert timestamps
+    current_period_end = datetime.fromtimestamp(current_period_end_ts, tz=timezone.utc)
+    trial_end = None
+    if trial_end_ts:
+        trial_end = datetime.fromtimestamp(trial_end_ts, tz=timezone.utc)
+
+    return {
+        "stripe_customer_id": customer_id,
+        "stripe_price_id": price_id,
+        "status": status,
+        "current_period_end": current_period_end,
+        "cancel_at_period_end": cancel_at_period_end,
+        "trial_end": trial_end,
+    }
+
+
+def upsert_subscription(stripe_sub):
+    """Write a Stripe subscription object to our database"""
+    stripe_subscription_id = stripe_sub["id"]
+
+    fields = parse_stripe_subscription(stripe_sub)
+    customer = StripeCustomer.objects.get(
+        stripe_customer_id=fields.pop("stripe_customer_id")
+    )
+
+    with transaction.atomic():
         # Update or create subscription
         subscription, created = Subscription.objects.update_or_create(
             stripe_subscription_id=stripe_subscription_id,
-            defaults={
-                "customer": customer,
-                "stripe_price_id": price_id,
-                "status": status,
-                "current_period_end": current_period_end,
-                "cancel_at_period_end": cancel_at_period_end,
-                "trial_end": trial_end,
-            },
+            defaults={"customer": customer, **fields},
         )
+        StripeCustomer.objects.filter(pk=customer.pk).refresh_current_subscription()
 
-        action = "Created" if created else "Updated"
-        logger.info(f"{action} subscription {stripe_subscription_id}")
-        return subscription
+    refresh_entitlement(customer.user_id)
 
-    except stripe.error.StripeError as e:
-        logger.error(f"Stripe error syncing subscription: {str(e)}")
-        raise
-    except StripeCustomer.DoesNotExist:
-        logger.error(f"Customer not found for subscription {stripe_subscription_id}")
-        raise
+    action = "Created" if created else "Updated"
+    logger.info(f"{action} subscription {stripe_subscription_id}")
+    return subscription
 
 
 def check_subscription_access(user, required_status=None):
@@ -152,9 +215,7 @@ def check_subscription_access(user, required_status=None):
     if required_status is None:
         required_status = ["active", "trialing"]
 
-    try:
-        customer = user.stripe_customer
-        subscription = customer.active_subscription
-        return subscription and subscription.status in required_status
-    except (AttributeError, StripeCustomer.DoesNotExist):
+    if not getattr(user, "is_authenticated", False):
         return False
+
+    return get_entitlement(user.id) in required_status
@@ -1,32 +1,39 @@
+import json
+from datetime import datetime, timezone
+
 import stripe
 import structlog
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
 
-from .utils import get_or_create_stripe_customer, get_user_subscription_status
-from .webhook_handlers import webhook_handler
+from .cache import invalidate_entitlement
+from .models import StripeCustomer, WebhookEvent
+from .stripe_client import CircuitOpenError
+from .tasks import process_webhook_event
+from .utils import aget_or_create_stripe_customer, get_user_subscription_status
+from .webhook_handlers import get_event_subscription_id
 
 logger = structlog.get_logger(__name__)
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 
 @login_required
 @require_POST
-def create_checkout_session(request):
+async def create_checkout_session(request):
     """Create a Stripe Checkout session for subscription"""
     try:
+        user = await request.auser()
         price_id = request.POST.get("price_id")
         if not price_id:
             return JsonResponse({"error": "Price ID is required"}, status=400)
 
-        customer = get_or_create_stripe_customer(request.user)
+        customer = await aget_or_create_stripe_customer(user)
 
         # Check if user already has an active subscription
-        if customer.has_active_subscription:
+        if await customer.ahas_active_subscription():
             return JsonResponse(
                 {
                     "error": "You already have an active subscription. Please manage it from the billing portal."
@@ -51,7 +58,7 @@ def create_checkout_session(request):
             + "?session_id={CHECKOUT_SESSION_ID}",
             "cancel_url": settings.STRIPE_CANCEL_URL,
             "metadata": {
-                "user_id": str(request.user.id),
+                "user_id": str(user.id),
             },
             # Allow promotion codes if configured
             "allow_promotion_codes": getattr(
@@ -62,10 +69,15 @@ def create_checkout_session(request):
         if trial_days:
             checkout_params["subscription_data"] = {"trial_period_days": trial_days}
 
-        checkout_session = stripe.checkout.Session.create(**checkout_params)
+        checkout_session = await stripe.checkout.Session.create_async(**checkout_params)
 
         return JsonResponse({"checkout_url": checkout_session.url})
 
+    except CircuitOpenError:
+        return JsonResponse(
+            {"error": "Billing is temporarily unavailable, please try again shortly"},
+            status=503,
+        )
     except stripe.error.StripeError as e:
         logger.error(f"Stripe error: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
@@ -76,17 +88,18 @@ def create_checkout_session(request):
 
 @login_required
 @require_POST
-def create_portal_session(request):
+async def create_portal_session(request):
     """Create a Stripe Customer Portal session for subscription management"""
     try:
-        customer = request.user.stripe_customer
+        user = await request.auser()
+        customer = await StripeCustomer.objects.aget(user=user)
 
         # Configure portal based on subscription status
         configuration_params = {}
         if hasattr(settings, "STRIPE_PORTAL_CONFIG_ID"):
             configuration_params["configuration"] = settings.STRIPE_PORTAL_CONFIG_ID
 
-        session = stripe.billing_portal.Session.create(
+        session = await stripe.billing_portal.Session.create_async(
             customer=customer.stripe_customer_id,
             return_url=settings.STRIPE_PORTAL_RETURN_URL,
             **configuration_params,
@@ -94,8 +107,13 @@ def create_portal_session(request):
 
         return JsonResponse({"url": session.url})
 
-    except AttributeError:
+    except StripeCustomer.DoesNotExist:
         return JsonResponse({"error": "No billing information found"}, status=404)
+    except CircuitOpenError:
+        return JsonResponse(
+            {"error": "Billing is temporarily unavailable, please try again shortly"},
+            status=503,
+        )
     except stripe.error.StripeError as e:
         logger.error(f"Stripe error: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
@@ -124,22 +142,24 @@ def subscription_status(request):
 
 @login_required
 @require_POST
-def cancel_subscription(request):
+async def cancel_subscription(request):
     """Cancel subscription at period end"""
     try:
-        customer = request.user.stripe_customer
-        subscription = customer.active_subscription
+        user = await request.auser()
+        customer = await StripeCustomer.objects.aget(user=user)
+        subscription = await customer.aactive_subscription()
 
         if not subscription:
             return JsonResponse({"error": "No active subscription found"}, status=404)
 
         # Cancel at period end (user keeps access until end of billing period)
-        stripe.Subscription.modify(
+        await stripe.Subscription.modify_async(
             subscription.stripe_subscription_id, cancel_at_period_end=True
         )
 
         subscription.cancel_at_period_end = True
-        subscription.save()
+        await subscription.asave()
+        await sync_to_async(invalidate_entitlement)(user.id)
 
         return JsonResponse(
             {
@@ -149,8 +169,13 @@ def cancel_subscription(request):
             }
         )
 
-    except AttributeError:
+    except StripeCustomer.DoesNotExist:
         return JsonResponse({"error": "No billing information found"}, status=404)
+    except CircuitOpenError:
+        return JsonResponse(
+            {"error": "Billing is temporarily unavailable, please try again shortly"},
+            status=503,
+        )
     except stripe.error.StripeError as e:
         logger.error(f"Stripe error: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
@@ -161,29 +186,36 @@ def cancel_subscription(request):
 
 @login_required
 @require_POST
-def reactivate_subscription(request):
+async def reactivate_subscription(request):
     """Reactivate a canceled subscription"""
     try:
-        customer = request.user.stripe_customer
-        subscription = customer.active_subscription
+        user = await request.auser()
+        customer = await StripeCustomer.objects.aget(user=user)
+        subscription = await customer.aactive_subscription()
 
         if not subscription or not subscription.cancel_at_period_end:
             return JsonResponse({"error": "No canceled subscription found"}, status=404)
 
         # Reactivate subscription
-        stripe.Subscription.modify(
+        await stripe.Subscription.modify_async(
             subscription.stripe_subscription_id, cancel_at_period_end=False
         )
 
         subscription.cancel_at_period_end = False
-        subscription.save()
+        await subscription.asave()
+        await sync_to_async(invalidate_entitlement)(user.id)
 
         return JsonResponse(
             {"success": True, "message": "Subscription has been reactivated"}
         )
 
-    except AttributeError:
+    except StripeCustomer.DoesNotExist:
         return JsonResponse({"error": "No billing information found"}, status=404)
+    except CircuitOpenError:
+        return JsonResponse(
+            {"error": "Billing is temporarily unavailable, please try again shortly"},
+            status=503,
+        )
     except stripe.error.StripeError as e:
         logger.error(f"Stripe error: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
@@ -210,10 +242,31 @@ def stripe_webhook(request):
         logger.error("Invalid webhook signature")
         return HttpResponse(status=400)
 
-    # Handle the event
+    # Persist the event and let the billing webhook queue process it
     try:
-        webhook_handler(event)
-        return HttpResponse(status=200)
+        webhook_event, created = WebhookEvent.objects.get_or_create(
+            stripe_event_id=event["id"],
+            defaults={
+                "type": event["type"],
+                "payload": json.loads(payload),
+                "stripe_subscription_id": get_event_subscription_id(event),
+                "stripe_created": datetime.fromtimestamp(
+                    event["created"], tz=timezone.utc
+                ),
+            },
+        )
     except Exception as e:
-        logger.error(f"Webhook handler error: {str(e)}")
+        logger.error(f"Error storing webhook event: {str(e)}")
         return HttpResponse(status=500)
+
+    if not created:
+        logger.info(f"Duplicate webhook event ignored: {event['id']}")
+        return HttpResponse(status=200)
+
+    try:
+        process_webhook_event.delay(webhook_event.pk)
+    except Exception as e:
+        # The event is stored; process_pending_webhook_events will pick it up
+        logger.error(f"Error enqueuing webhook event {event['id']}: {str(e)}")
+
+    return HttpResponse(status=200)
@@ -1,12 +1,32 @@
+from datetime import datetime, timezone
+
 import structlog
+from django.db import transaction
 
-from .utils import sync_subscription_from_stripe
+from . import catalog
+from .cache import refresh_entitlement
+from .utils import apply_subscription_payload, sync_subscription_from_stripe
 
 logger = structlog.get_logger(__name__)
 
+# Events whose handling amounts to a full sync of one subscription. The
+# webhook worker coalesces these per subscription into a single sync.
+SUBSCRIPTION_SYNC_EVENTS = {
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "checkout.session.completed",
+    "invoice.payment_succeeded",
+    "invoice.payment_failed",
+}
+
 
 def webhook_handler(event):
-    """Subscription-focused webhook handler"""
+    """
+    Subscription-focused webhook handler
+
+    Handlers log and re-raise errors so `process_webhook_event` can retry the
+    event or mark it failed.
+    """
     logger.info(f"Received webhook event: {event['type']} - {event['id']}")
 
     # Handle subscription lifecycle events
@@ -18,6 +38,13 @@ def webhook_handler(event):
         "checkout.session.completed": handle_checkout_session_completed,
         "invoice.payment_succeeded": handle_invoice_payment_succeeded,
         "invoice.payment_failed": handle_invoice_payment_failed,
+        # Price catalog events
+        "price.created": handle_price_changed,
+        "price.updated": handle_price_changed,
+        "price.deleted": handle_price_deleted,
+        "product.created": handle_product_changed,
+        "product.updated": handle_product_changed,
+        "product.deleted": handle_product_deleted,
     }
 
     handler = subscription_events.get(event["type"])
@@ -27,6 +54,62 @@ def webhook_handler(event):
         logger.info(f"Unhandled event type: {event['type']}")
 
 
+def get_event_subscription_id(event):
+    """Return the Stripe subscription id an event refers to, or "" """
+    obj = event["data"]["object"]
+
+    if event["type"].startswith("customer.subscription."):
+        return obj.get("id") or ""
+    if event["type"].startswith(("invoice.", "checkout.session.")):
+        return obj.get("subscription") or ""
+    return ""
+
+
+def handle_subscription_events(stripe_subscription_id, events):
+    """Apply a batch of sync events for one subscription with a single sync"""
+    logger.info(
+        f"Syncing subscription {stripe_subscription_id} for "
+        f"{len(events)} coalesced events"
+    )
+
+    # Let errors propagate so the worker can retry the whole batch
+    latest = get_latest_subscription_object(events)
+    if latest:
+        apply_subscription_payload(latest)
+    else:
+        sync_subscription_from_stripe(stripe_subscription_id)
+
+    follow_ups = {
+        "customer.subscription.updated": log_subscription_status,
+        "invoice.payment_failed": notify_payment_failed,
+    }
+
+    for event in events:
+        follow_up = follow_ups.get(event["type"])
+        if follow_up:
+            follow_up(event)
+
+
+def get_latest_subscription_object(events):
+    """
+    Return the subscription object carried by the newest event in a batch
+
+    Returns None when the newest event is not a subscription event (invoices
+    and checkout sessions don't carry subscription state) or when the order
+    of the newest events is ambiguous, in which case the caller should fetch.
+    """
+    newest = max(event["created"] for event in events)
+    latest = [
+        event
+        for event in events
+        if event["created"] == newest
+        and event["type"].startswith("customer.subscription.")
+    ]
+    if len(latest) != 1:
+        return None
+    return latest[0]["data"]["object"]
+
+
 def handle_checkout_session_completed(event):
     """Handle successful checkout - important for initial subscription creation"""
     session = event["data"]["object"]
@@ -43,6 +126,7 @@ def handle_checkout_session_completed(event):
             sync_subscription_from_stripe(session["subscription"])
         except Exception as e:
             logger.error(f"Error syncing subscription from checkout: {str(e)}")
+            raise
 
 
 def handle_subscription_created(event):
@@ -50,10 +134,11 @@ def handle_subscription_created(event):
     subscription = event["data"]["object"]
 
     try:
-        sync_subscription_from_stripe(subscription["id"])
+        apply_subscription_payload(subscription)
         logger.info(f"Subscription created: {subscription['id']}")
     except Exception as e:
         logger.error(f"Error handling subscription creation: {str(e)}")
+        raise
 
 
 def handle_subscription_updated(event):
@@ -61,19 +146,25 @@ def handle_subscription_updated(event):
     subscription = event["data"]["object"]
 
     try:
-        sync_subscription_from_stripe(subscription["id"])
-        logger.info(
-            f"Subscription updated: {subscription['id']} - Status: {subscription['status']}"
-        )
-
-        # Log important status changes
-        if subscription["status"] == "past_due":
-            logger.warning(f"Subscription {subscription['id']} is past due")
-        elif subscription["status"] == "unpaid":
-            logger.warning(f"Subscription {subscription['id']} is unpaid")
-
+        apply_subscription_payload(subscription)
+        log_subscription_status(event)
     except Exception as e:
         logger.error(f"Error handling subscription update: {str(e)}")
+        raise
+
+
+def log_subscription_status(event):
+    """Log important subscription status changes"""
+    subscription = event["data"]["object"]
+
+    logger.info(
+        f"Subscription updated: {subscription['id']} - Status: {subscription['status']}"
+    )
+
+    if subscription["status"] == "past_due":
+        logger.warning(f"Subscription {subscription['id']} is past due")
+    elif subscription["status"] == "unpaid":
+        logger.warning(f"Subscription {subscription['id']} is unpaid")
 
 
 def handle_subscription_deleted(event):
@@ -81,7 +172,7 @@ def handle_subscription_deleted(event):
     subscription = event["data"]["object"]
 
     try:
-        from .models import Subscription
+        from .models import StripeCustomer, Subscription
 
         # Update local subscription status
         sub = Subscription.objects.filter(
@@ -90,7 +181,17 @@ def handle_subscription_deleted(event):
 
         if sub:
             sub.status = "canceled"
-            sub.save()
+            # Older events for this subscription are discarded from now on, so
+            # a late update payload can't bring it back to life
+            event_created = datetime.fromtimestamp(event["created"], tz=timezone.utc)
+            if not sub.last_event_created or sub.last_event_created < event_created:
+                sub.last_event_created = event_created
+            with transaction.atomic():
+                sub.save()
+                StripeCustomer.objects.filter(
+                    pk=sub.customer_id
+                ).refresh_current_subscription()
+            refresh_entitlement(sub.customer.user_id)
             logger.info(f"Subscription canceled: {subscription['id']}")
         else:
             logger.warning(
@@ -99,6 +200,7 @@ def handle_subscription_deleted(event):
 
     except Exception as e:
         logger.error(f"Error handling subscription deletion: {str(e)}")
+        raise
 
 
 def handle_subscription_trial_will_end(event):
@@ -125,6 +227,7 @@ def handle_subscription_trial_will_end(event):
 
     except Exception as e:
         logger.error(f"Error handling trial ending notification: {str(e)}")
+        raise
 
 
 def handle_invoice_payment_succeeded(event):
@@ -141,6 +244,7 @@ def handle_invoice_payment_succeeded(event):
         sync_subscription_from_stripe(invoice["subscription"])
     except Exception as e:
         logger.error(f"Error syncing subscription after payment: {str(e)}")
+        raise
 
 
 def handle_invoice_payment_failed(event):
@@ -155,19 +259,75 @@ def handle_invoice_payment_failed(event):
     try:
         # Sync subscription to update status
         sync_subscription_from_stripe(invoice["subscription"])
+        notify_payment_failed(event)
+    except Exception as e:
+        logger.error(f"Error handling payment failure: {str(e)}")
+        raise
 
-        # This is where you'd typically send a payment failed email
-        from .models import Subscription
 
-        sub = Subscription.objects.filter(
-            stripe_subscription_id=invoice["subscription"]
-        ).first()
+def notify_payment_failed(event):
+    """Notify the user that a subscription payment failed"""
+    invoice = event["data"]["object"]
 
-        if sub:
-            logger.warning(
-                f"Payment failed notification for user: {sub.customer.user.email}"
-            )
-            # Add custom logic here (e.g., send payment failed email)
+    # This is where you'd typically send a payment failed email
+    from .models import Subscription
+
+    sub = (
+        Subscription.objects.filter(stripe_subscription_id=invoice["subscription"])
+        .select_related("customer__user")
+        .first()
+    )
 
+    if sub:
+        logger.warning(
+            f"Payment failed notification for user: {sub.customer.user.email}"
+        )
+        # Add custom logic here (e.g., send payment failed email)
+
+
+def handle_price_changed(event):
+    """Keep the local price catalog in sync with Stripe"""
+    price = event["data"]["object"]
+
+    try:
+        catalog.store_price(price)
+        logger.info(f"Price catalog updated: {price['id']}")
     except Exception as e:
-        logger.error(f"Error handling payment failure: {str(e)}")
+        logger.error(f"Error updating price catalog: {str(e)}")
+        raise
+
+
+def handle_price_deleted(event):
+    """Remove a deleted price from the local catalog"""
+    price = event["data"]["object"]
+
+    try:
+        catalog.remove_price(price["id"])
+        logger.info(f"Price removed from catalog: {price['id']}")
+    except Exception as e:
+        logger.error(f"Error removing price from catalog: {str(e)}")
+        raise
+
+
+def handle_product_changed(event):
+    """Keep product (plan) names in the local catalog in sync with Stripe"""
+    product = event["data"]["object"]
+
+    try:
+        catalog.store_product(product)
+        logger.info(f"Product catalog updated: {product['id']}")
+    except Exception as e:
+        logger.error(f"Error updating product catalog: {str(e)}")
+        raise
+
+
+def handle_product_deleted(event):
+    """Remove a deleted product from the local catalog"""
+    product = event["data"]["object"]
+
+    try:
+        catalog.remove_product(product["id"])
+        logger.info(f"Product removed from catalog: {product['id']}")
+    except Exception as e:
+        logger.error(f"Error removing product from catalog: {str(e)}")
+        raise
@@ -1,9 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 
 import os
+import time
 
 from celery import Celery
-from celery.signals import worker_ready
+from celery.signals import before_task_publish, worker_ready
 from celeryapp import celery_config
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
@@ -12,6 +13,10 @@ app = Celery("web")
 
 app.config_from_object(celery_config)
 
+# Held after a worker warms the price catalog so the other workers starting
+# alongside it don't queue the same warm-up
+WARM_PRICE_CATALOG_LOCK_KEY = "celeryapp:warm-price-catalog-lock"
+
 
 @worker_ready.connect
 def setup_sentry_handlers(**kwargs):
@@ -23,3 +28,21 @@ def setup_sentry_handlers(**kwargs):
             from . import sentry_handlers  # noqa: F401
     except Exception:
         pass  # Sentry handlers are optional
+
+
+@worker_ready.connect
+def warm_price_catalog(**kwargs):
+    """Warm the Stripe price catalog so web requests never fetch prices."""
+    from billing.tasks import warm_price_catalog
+    from django.core.cache import cache
+
+    # One warm-up per deploy; the hourly beat entry keeps it fresh after that
+    if cache.add(WARM_PRICE_CATALOG_LOCK_KEY, True, timeout=10 * 60):
+        warm_price_catalog.delay()
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    """Record when a task was queued, for the queue latency metric."""
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
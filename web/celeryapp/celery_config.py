@@ -1,7 +1,7 @@
 import os
 
 from celery.schedules import crontab
-from kombu import Exchange
+from kombu import Exchange, Queue
 
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD")
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
@@ -9,7 +9,16 @@ REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 
 broker_url = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:6379/0"
 result_backend = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:6379/0"
-result_expires = 60 * 60 * 24  # 24 hours
+
+# Nothing reads task results, so by default tasks don't store them (or
+# subscribe to their result channel when queued). A task whose caller needs
+# the result opts in with @shared_task(ignore_result=False); those results
+# are stored as plain JSON without the extended task metadata, and expire
+# once the caller has had time to read them.
+task_ignore_result = True
+result_serializer = "json"
+result_extended = False
+result_expires = 60 * 60  # 1 hour
 
 task_default_queue = "default"
 task_default_exchange_type = "topic"
@@ -23,7 +32,62 @@ redbeat_redis_url = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:6379/1"
 
 default_exchange = Exchange("default", type="topic")
 
-task_queues = ()
+# Priorities are emulated by the Redis transport as one list per step within
+# each queue; 0 is served first. Tasks without a route priority get
+# task_default_priority (5, which falls in the 3 step).
+broker_transport_options = {"priority_steps": [0, 3, 6, 9]}
+
+task_queues = (
+    Queue("default", default_exchange, routing_key="default"),
+    # Transactional email, consumed alongside default
+    Queue("mail", default_exchange, routing_key="mail"),
+    # Stripe catalog and reconcile work
+    Queue("billing", default_exchange, routing_key="billing"),
+    # Stripe webhook events are drained by their own worker so bursts
+    # (e.g. renewals at period boundaries) don't starve other tasks
+    Queue("billing_webhooks", default_exchange, routing_key="billing.webhooks"),
+    # Long-running cleanups get a single-slot worker of their own
+    Queue("maintenance", default_exchange, routing_key="maintenance"),
+)
+
+MAIL = {"queue": "mail", "routing_key": "mail"}
+BILLING = {"queue": "billing", "routing_key": "billing"}
+BILLING_WEBHOOKS = {"queue": "billing_webhooks", "routing_key": "billing.webhooks"}
+MAINTENANCE = {"queue": "maintenance", "routing_key": "maintenance"}
+
+task_routes = {
+    # A user is waiting on the reset email
+    "authapi.tasks.send_password_reset_email": {**MAIL, "priority": 0},
+    "authapi.tasks.send_verification_email": {**MAIL, "priority": 3},
+    "mail.tasks.flush_outbox": {**MAIL, "priority": 0},
+    "authapi.tasks.cleanup_unverified_accounts": MAINTENANCE,
+    "authapi.tasks.purge_used_tokens": MAINTENANCE,
+    "billing.tasks.process_webhook_event": {**BILLING_WEBHOOKS, "priority": 0},
+    "billing.tasks.sync_subscription_events": {**BILLING_WEBHOOKS, "priority": 0},
+    "billing.tasks.process_pending_webhook_events": {
+        **BILLING_WEBHOOKS,
+        "priority": 6,
+    },
+    "billing.tasks.refresh_price": {**BILLING, "priority": 0},
+    "billing.tasks.warm_price_catalog": {**BILLING, "priority": 3},
+    "billing.tasks.reconcile_all_subscriptions": {**BILLING, "priority": 9},
+    "billing.tasks.reconcile_subscription_window": {**BILLING, "priority": 9},
+}
+
+# Idempotent tasks are acknowledged after they finish, so a worker crash
+# re-delivers them. Emails are acknowledged on receipt so a crash can't send
+# the same email twice.
+task_annotations = {
+    name: {"acks_late": True, "reject_on_worker_lost": True}
+    for name in [
+        "authapi.tasks.cleanup_unverified_accounts",
+        "authapi.tasks.purge_used_tokens",
+        "billing.tasks.process_webhook_event",
+        "billing.tasks.sync_subscription_events",
+        "billing.tasks.process_pending_webhook_events",
+        "billing.tasks.reconcile_subscription_window",
+    ]
+}
 
 # Celery Beat schedule
 beat_schedule = {
@@ -31,4 +95,24 @@ beat_schedule = {
         "task": "authapi.tasks.cleanup_unverified_accounts",
         "schedule": crontab(hour=3, minute=0),  # Run daily at 3 AM
     },
+    "purge-used-tokens": {
+        "task": "authapi.tasks.purge_used_tokens",
+        "schedule": crontab(minute=30),  # Run hourly
+    },
+    "warm-price-catalog": {
+        "task": "billing.tasks.warm_price_catalog",
+        "schedule": crontab(minute=0),  # Run hourly
+    },
+    "reconcile-subscriptions": {
+        "task": "billing.tasks.reconcile_all_subscriptions",
+        "schedule": crontab(hour=4, minute=0),  # Run daily at 4 AM
+    },
+    "publish-unpublished-tasks": {
+        "task": "celeryapp.tasks.publish_unpublished_tasks",
+        "schedule": crontab(minute="*"),  # Run every minute
+    },
+    "process-pending-webhook-events": {
+        "task": "billing.tasks.process_pending_webhook_events",
+        "schedule": crontab(minute="*/5"),  # Run every 5 minutes
+    },
 }
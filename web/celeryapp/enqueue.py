@@ -0,0 +1,101 @@
+"""
+Transaction-aware task enqueueing.
+
+`enqueue(task.s(...))` publishes a task once the current transaction commits,
+so a worker never looks for rows the request hasn't committed yet, and a
+rolled-back request enqueues nothing. During a request (see
+`DeferredTaskMiddleware`) committed tasks are collected and published together
+on one producer connection when the view returns.
+
+If the broker can't be reached, the tasks are stored as `UnpublishedTask` rows
+and `publish_unpublished_tasks` publishes them once it is back.
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+
+import structlog
+from asgiref.local import Local
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+logger = structlog.get_logger(__name__)
+
+_pending = Local()
+
+
+def enqueue(signature, using=None):
+    """Publish the task `signature` after the current transaction commits"""
+    transaction.on_commit(partial(_committed, signature), using=using)
+
+
+def _committed(signature):
+    batch = getattr(_pending, "batch", None)
+    if batch is None:
+        publish([signature])
+    else:
+        batch.append(signature)
+
+
+@contextmanager
+def deferred_publishes():
+    """Collect the tasks enqueued in the block and publish them on exit"""
+    if getattr(_pending, "batch", None) is not None:
+        yield
+        return
+
+    _pending.batch = batch = []
+    try:
+        yield
+    finally:
+        del _pending.batch
+        publish(batch)
+
+
+@asynccontextmanager
+async def adeferred_publishes():
+    """`deferred_publishes` for async code, publishing from a thread"""
+    if getattr(_pending, "batch", None) is not None:
+        yield
+        return
+
+    _pending.batch = batch = []
+    try:
+        yield
+    finally:
+        del _pending.batch
+        if batch:
+            await sync_to_async(publish)(batch)
+
+
+def publish(signatures):
+    """Publish `signatures` over one connection, storing any that fail"""
+    from celeryapp.celery import app
+
+    if not signatures:
+        return 0
+
+    published = 0
+    try:
+        with app.producer_or_acquire() as producer:
+            # Fall back to the database straight away rather than retrying
+            # the connection on the request path
+            producer.connection.ensure_connection(max_retries=0, timeout=1)
+            for signature in signatures:
+                signature.apply_async(producer=producer, retry=False)
+                published += 1
+    except Exception as e:
+        unpublished = signatures[published:]
+        logger.error(
+            f"Error publishing {len(unpublished)} tasks, storing them: {str(e)}"
+        )
+        store_unpublished(unpublished)
+    return published
+
+
+def store_unpublished(signatures):
+    from .models import UnpublishedTask
+
+    UnpublishedTask.objects.bulk_create(
+        [UnpublishedTask(signature=dict(signature)) for signature in signatures]
+    )
@@ -0,0 +1,53 @@
+from celeryapp.celery import app
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Report the number and memory usage of task results in the result backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of keys to measure per round trip",
+        )
+
+    def handle(self, *args, **options):
+        client = app.backend.client
+        pattern = app.backend.get_key_for_task("*")
+        batch_size = options["batch_size"]
+
+        keys = total = persistent = 0
+        batch = []
+        for key in client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) == batch_size:
+                total, persistent = self.measure(client, batch, total, persistent)
+                keys += len(batch)
+                batch = []
+        if batch:
+            total, persistent = self.measure(client, batch, total, persistent)
+            keys += len(batch)
+
+        average = total / keys if keys else 0
+        self.stdout.write(
+            f"{keys} task results using {total / 1024:.1f} KiB "
+            f"({average:.0f} bytes each)"
+        )
+        if persistent:
+            self.stdout.write(
+                self.style.WARNING(f"{persistent} task results have no expiry")
+            )
+
+    def measure(self, client, batch, total, persistent):
+        pipe = client.pipeline(transaction=False)
+        for key in batch:
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        results = pipe.execute()
+
+        # Keys that expired since the scan report no usage
+        total += sum(size or 0 for size in results[::2])
+        persistent += sum(1 for ttl in results[1::2] if ttl == -1)
+        return total, persistent
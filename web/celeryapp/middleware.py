@@ -0,0 +1,25 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .enqueue import adeferred_publishes, deferred_publishes
+
+
+class DeferredTaskMiddleware:
+    """Publish the tasks a request enqueues together, once the view returns"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deferred_publishes():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with adeferred_publishes():
+            return await self.get_response(request)
@@ -0,0 +1,11 @@
+from django.db import models
+
+
+class UnpublishedTask(models.Model):
+    """A task signature that couldn't be published while the broker was down"""
+
+    signature = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["pk"]
@@ -4,6 +4,48 @@
 
 from authapi.tasks import (  # noqa: F401
     cleanup_unverified_accounts,
+    purge_used_tokens,
     send_password_reset_email,
     send_verification_email,
 )
+from billing.tasks import (  # noqa: F401
+    process_pending_webhook_events,
+    process_webhook_event,
+    reconcile_all_subscriptions,
+    reconcile_subscription_window,
+    refresh_price,
+    sync_subscription_events,
+    warm_price_catalog,
+)
+from celery import shared_task
+from mail.tasks import flush_outbox  # noqa: F401
+
+# Held while stored tasks are published so overlapping runs can't send a
+# task twice
+PUBLISH_UNPUBLISHED_LOCK_KEY = "celeryapp:publish-unpublished-lock"
+
+
+@shared_task
+def publish_unpublished_tasks():
+    """Publish tasks that were stored while the broker was unreachable."""
+    from django.core.cache import cache
+
+    from .celery import app
+    from .models import UnpublishedTask
+
+    if not cache.add(PUBLISH_UNPUBLISHED_LOCK_KEY, True, timeout=5 * 60):
+        return "Stored tasks are already being published"
+
+    published = 0
+    try:
+        with app.producer_or_acquire() as producer:
+            for row in UnpublishedTask.objects.iterator():
+                app.signature(row.signature).apply_async(producer=producer)
+                # Delete as soon as it is sent, so a later failure can't
+                # leave it behind to be sent again
+                row.delete()
+                published += 1
+    finally:
+        cache.delete(PUBLISH_UNPUBLISHED_LOCK_KEY)
+
+    return f"Published {published} stored tasks"
@@ -0,0 +1,151 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from authapi.tasks import send_password_reset_email, send_verification_email
+from celeryapp.celery import app
+from celeryapp.enqueue import deferred_publishes, enqueue, publish, store_unpublished
+from celeryapp.middleware import DeferredTaskMiddleware
+from celeryapp.models import UnpublishedTask
+from celeryapp.tasks import publish_unpublished_tasks
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from kombu.exceptions import OperationalError
+
+
+class EnqueueTest(TestCase):
+    def test_publishes_after_commit(self):
+        with mock.patch("celeryapp.enqueue.publish") as publish_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue(send_password_reset_email.s(1))
+                publish_mock.assert_not_called()
+
+        (signatures,), _ = publish_mock.call_args
+        self.assertEqual(signatures, [send_password_reset_email.s(1)])
+
+    def test_rolled_back_transaction_publishes_nothing(self):
+        with mock.patch("celeryapp.enqueue.publish") as publish_mock:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        enqueue(send_password_reset_email.s(1))
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.assertEqual(callbacks, [])
+        publish_mock.assert_not_called()
+
+    def test_deferred_tasks_are_published_together(self):
+        with mock.patch("celeryapp.enqueue.publish") as publish_mock:
+            with deferred_publishes():
+                with self.captureOnCommitCallbacks(execute=True):
+                    enqueue(send_password_reset_email.s(1))
+                    enqueue(send_verification_email.s(2))
+                publish_mock.assert_not_called()
+
+        publish_mock.assert_called_once_with(
+            [send_password_reset_email.s(1), send_verification_email.s(2)]
+        )
+
+    def test_register_enqueues_verification_email_on_commit(self):
+        cache.clear()
+        with mock.patch("celeryapp.enqueue.publish") as publish_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("auth_register"),
+                    {
+                        "email": "new@example.com",
+                        "password": "Str0ng-passw0rd!",
+                        "password_confirm": "Str0ng-passw0rd!",
+                    },
+                )
+
+        self.assertEqual(response.status_code, 201)
+        (signatures,), _ = publish_mock.call_args
+        self.assertEqual(
+            [signature.task for signature in signatures],
+            ["authapi.tasks.send_verification_email"],
+        )
+
+
+class BrokerDownTest(TestCase):
+    def test_unpublished_tasks_are_stored_and_published_later(self):
+        with mock.patch.object(
+            app, "producer_or_acquire", side_effect=OperationalError("down")
+        ):
+            publish([send_password_reset_email.s(1), send_verification_email.s(2)])
+
+        self.assertEqual(UnpublishedTask.objects.count(), 2)
+
+        with (
+            mock.patch.object(app, "producer_or_acquire"),
+            mock.patch("celery.canvas.Signature.apply_async") as apply_async,
+        ):
+            publish_unpublished_tasks()
+
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertFalse(UnpublishedTask.objects.exists())
+
+    def test_tasks_sent_before_a_failure_are_not_sent_again(self):
+        store_unpublished(
+            [
+                send_password_reset_email.s(1),
+                send_verification_email.s(2),
+                send_verification_email.s(3),
+            ]
+        )
+
+        with (
+            mock.patch.object(app, "producer_or_acquire"),
+            mock.patch(
+                "celery.canvas.Signature.apply_async",
+                side_effect=[None, OperationalError("down")],
+            ),
+            self.assertRaises(OperationalError),
+        ):
+            publish_unpublished_tasks()
+
+        self.assertEqual(
+            [row.signature["args"] for row in UnpublishedTask.objects.all()],
+            [[2], [3]],
+        )
+
+        with (
+            mock.patch.object(app, "producer_or_acquire"),
+            mock.patch("celery.canvas.Signature.apply_async") as apply_async,
+        ):
+            publish_unpublished_tasks()
+
+        self.assertEqual(apply_async.call_count, 2)
+
+
+class DeferredTaskMiddlewareTest(TestCase):
+    def test_keeps_asgi_middleware_chain_async(self):
+        self.assertTrue(iscoroutinefunction(ASGIHandler()._middleware_chain))
+
+    async def test_async_requests_publish_together(self):
+        @sync_to_async
+        def enqueue_committed(*signatures):
+            with self.captureOnCommitCallbacks(execute=True):
+                for signature in signatures:
+                    enqueue(signature)
+
+        async def view(request):
+            await enqueue_committed(
+                send_password_reset_email.s(1), send_verification_email.s(2)
+            )
+            return HttpResponse()
+
+        middleware = DeferredTaskMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        with mock.patch("celeryapp.enqueue.publish") as publish_mock:
+            await middleware(RequestFactory().get("/"))
+
+        publish_mock.assert_called_once_with(
+            [send_password_reset_email.s(1), send_verification_email.s(2)]
+        )
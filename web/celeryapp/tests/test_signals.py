@@ -0,0 +1,18 @@
+from unittest import mock
+
+from celeryapp.celery import warm_price_catalog
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+
+class WarmPriceCatalogOnStartTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_only_the_first_worker_to_start_queues_a_warm_up(self):
+        with mock.patch("billing.tasks.warm_price_catalog.delay") as delay:
+            for _ in range(4):
+                warm_price_catalog()
+
+        delay.assert_called_once_with()
@@ -0,0 +1,44 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate for unfiltered querysets
+
+    An unfiltered `SELECT COUNT(*)` scans the whole table on PostgreSQL. For
+    large tables the `pg_class.reltuples` estimate (kept current by autovacuum)
+    is used instead; filtered querysets and small tables are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate_count()
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+    def _estimate_count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is None or query.where or query.distinct:
+            return None
+
+        connection = connections[self.object_list.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [self.object_list.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+
+        # reltuples is -1 for tables that have never been analyzed
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
@@ -0,0 +1,81 @@
+"""
+SMTP backend with a process-wide persistent connection.
+
+Django's SMTP backend opens (and TLS-handshakes, and authenticates) a new
+connection for every `send_mail`. This backend hands the connection to the
+next send instead of closing it, so a Celery worker child pays the handshake
+once. If the server has hung up in the meantime, the send reconnects and is
+retried once. When the server refuses a message smtplib resets the SMTP
+transaction, so only that message fails and the connection is kept; after a
+connection-level error it is closed and dropped.
+"""
+
+import smtplib
+import threading
+
+from django.core.mail.backends import smtp
+
+# (host, port, username) -> open smtplib connection
+_connections = {}
+# smtplib connections aren't thread-safe
+_lock = threading.RLock()
+
+
+class PooledSMTPEmailBackend(smtp.EmailBackend):
+    def _pool_key(self):
+        return (self.host, self.port, self.username)
+
+    def open(self):
+        if self.connection:
+            return False
+
+        self.connection = _connections.get(self._pool_key())
+        if self.connection is not None:
+            return False
+
+        opened = super().open()
+        if opened:
+            _connections[self._pool_key()] = self.connection
+        return opened
+
+    def close(self):
+        # Keep the shared connection open for the next send
+        self.connection = None
+
+    def reset(self):
+        """Close and forget the shared connection."""
+        self.connection = _connections.pop(self._pool_key(), self.connection)
+        try:
+            super().close()
+        except (smtplib.SMTPException, OSError):
+            # It's being dropped because it's broken
+            pass
+
+    def send_messages(self, email_messages):
+        with _lock:
+            return super().send_messages(email_messages)
+
+    def _send(self, email_message):
+        # Let errors through to here, so a connection left mid-conversation
+        # isn't handed to the next send
+        fail_silently, self.fail_silently = self.fail_silently, False
+        try:
+            try:
+                return super()._send(email_message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Idle connections get dropped by the server; reconnect once
+                self.reset()
+                self.open()
+                return super()._send(email_message)
+        except (smtplib.SMTPException, OSError) as e:
+            # SMTPException subclasses OSError; of those only a disconnect
+            # means the connection itself is broken
+            if isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(
+                e, smtplib.SMTPException
+            ):
+                self.reset()
+            if fail_silently:
+                return False
+            raise
+        finally:
+            self.fail_silently = fail_silently
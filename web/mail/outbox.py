@@ -0,0 +1,81 @@
+"""
+Batched email sending.
+
+`queue_messages` appends messages to a Redis list and schedules a single
+`mail.tasks.flush_outbox` run EMAIL_BATCH_WINDOW seconds out (the same
+`cache.add` lock + countdown used for webhook coalescing), so messages queued
+during a signup wave go out together over one SMTP connection. With
+EMAIL_BATCH_WINDOW=0 messages are sent immediately.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django_redis import get_redis_connection
+
+OUTBOX_KEY = "mail:outbox"
+FLUSH_SCHEDULED_KEY = "mail:outbox:flush-scheduled"
+# Delay before messages left by a flush that ran out of retries are retried
+FAILED_FLUSH_DELAY = 5 * 60
+
+
+def serialize_message(message):
+    return json.dumps(
+        {
+            "subject": message.subject,
+            "body": message.body,
+            "from_email": message.from_email,
+            "to": message.to,
+            "alternatives": [
+                list(alternative)
+                for alternative in getattr(message, "alternatives", [])
+            ],
+        }
+    )
+
+
+def deserialize_message(data):
+    fields = json.loads(data)
+    alternatives = fields.pop("alternatives")
+    message = EmailMultiAlternatives(**fields)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+def queue_messages(messages):
+    """Send messages in the next outbox batch."""
+    if not settings.EMAIL_BATCH_WINDOW:
+        return get_connection().send_messages(messages)
+
+    get_redis_connection("default").rpush(
+        OUTBOX_KEY, *[serialize_message(message) for message in messages]
+    )
+    # Only the first message of a batch schedules the flush
+    schedule_flush(settings.EMAIL_BATCH_WINDOW)
+    return len(messages)
+
+
+def schedule_flush(countdown):
+    """Schedule a flush of the outbox unless one is already scheduled."""
+    from .tasks import flush_outbox
+
+    if cache.add(FLUSH_SCHEDULED_KEY, True, timeout=max(60, countdown * 2)):
+        flush_outbox.apply_async(countdown=countdown)
+
+
+def take_batch(size):
+    """Atomically pop up to `size` serialized messages off the outbox."""
+    pipe = get_redis_connection("default").pipeline()
+    pipe.lrange(OUTBOX_KEY, 0, size - 1)
+    pipe.ltrim(OUTBOX_KEY, size, -1)
+    batch, _ = pipe.execute()
+    return batch
+
+
+def return_batch(batch):
+    """Put unsent messages back at the head of the outbox."""
+    if batch:
+        get_redis_connection("default").lpush(OUTBOX_KEY, *reversed(batch))
@@ -0,0 +1,79 @@
+"""
+Template-based email rendering.
+
+Each email is a directory under `mail/templates/mail/` holding `subject.txt`,
+`body.txt` and, for rich emails, `body.html`. The compiled templates are kept
+per process (`get_email_templates`), and the parts of the HTML layout that
+depend only on settings and language are rendered once and reused
+(`{% static_fragment %}` from `mail_tags`), so rendering a message only
+evaluates the message's own variables.
+"""
+
+import functools
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import translation
+
+# (template name, language) -> rendered fragment
+_fragments = {}
+
+
+@functools.cache
+def get_email_templates(name):
+    """The compiled (subject, text, html) templates of an email"""
+    try:
+        html = get_template(f"mail/{name}/body.html")
+    except TemplateDoesNotExist:
+        html = None
+    return (
+        get_template(f"mail/{name}/subject.txt"),
+        get_template(f"mail/{name}/body.txt"),
+        html,
+    )
+
+
+def render_fragment(template_name):
+    """Render a template that only depends on settings, once per language"""
+    key = (template_name, translation.get_language())
+    if key not in _fragments:
+        _fragments[key] = get_template(template_name).render(
+            {"site_base_url": settings.SITE_BASE_DOMAIN.rstrip("/")}
+        )
+    return _fragments[key]
+
+
+def render_email(name, context, to, language=None):
+    """
+    Render the `name` email into a message with text and HTML parts
+
+    Args:
+        name: Directory of the email's templates under `mail/templates/mail/`
+        context: Template variables
+        to: List of recipient addresses
+        language: Language to render in; defaults to LANGUAGE_CODE
+
+    Returns:
+        EmailMultiAlternatives: The message, ready to send or queue
+    """
+    subject_template, text_template, html_template = get_email_templates(name)
+    with translation.override(language or settings.LANGUAGE_CODE):
+        # Headers can't contain newlines
+        subject = " ".join(subject_template.render(context).split())
+        message = EmailMultiAlternatives(
+            subject, text_template.render(context), settings.DEFAULT_FROM_EMAIL, to
+        )
+        if html_template is not None:
+            message.attach_alternative(html_template.render(context), "text/html")
+    return message
+
+
+@receiver(setting_changed)
+def clear_render_caches(*, setting, **kwargs):
+    if setting in {"TEMPLATES", "SITE_BASE_DOMAIN", "LANGUAGE_CODE"}:
+        get_email_templates.cache_clear()
+        _fragments.clear()
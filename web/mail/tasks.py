@@ -0,0 +1,48 @@
+import smtplib
+
+import structlog
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+
+logger = structlog.get_logger(__name__)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def flush_outbox(self):
+    """Send every queued email over one SMTP connection."""
+    from .outbox import (
+        FAILED_FLUSH_DELAY,
+        FLUSH_SCHEDULED_KEY,
+        deserialize_message,
+        return_batch,
+        schedule_flush,
+        take_batch,
+    )
+
+    # Messages queued from here on schedule the next flush
+    cache.delete(FLUSH_SCHEDULED_KEY)
+
+    sent = 0
+    with get_connection() as connection:
+        while batch := take_batch(settings.EMAIL_BATCH_SIZE):
+            for i, data in enumerate(batch):
+                message = deserialize_message(data)
+                try:
+                    connection.send_messages([message])
+                except smtplib.SMTPRecipientsRefused:
+                    # Retrying won't help, and would hold up the rest
+                    logger.warning(f"Dropping email to refused {message.to}")
+                    continue
+                except Exception as exc:
+                    return_batch(batch[i:])
+                    if self.request.retries >= self.max_retries:
+                        # Don't strand the returned messages until the next
+                        # queue_messages call
+                        schedule_flush(FAILED_FLUSH_DELAY)
+                        raise
+                    raise self.retry(exc=exc)
+                sent += 1
+
+    return f"Sent {sent} emails"
@@ -0,0 +1,11 @@
+from django import template
+from django.utils.safestring import mark_safe
+from mail.rendering import render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_fragment(template_name):
+    """Include a settings-only template, rendered once per language"""
+    return mark_safe(render_fragment(template_name))
@@ -1,8 +1,23 @@
 import os
+import smtplib
+import statistics
+import time
+import unittest
+from unittest import mock
 
 from django.conf import settings
 from django.core import mail
+from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.test import TestCase, override_settings
+from mail import backends, rendering
+from mail.outbox import (
+    FAILED_FLUSH_DELAY,
+    deserialize_message,
+    queue_messages,
+    serialize_message,
+)
+from mail.rendering import render_email
+from mail.tasks import flush_outbox
 from mail.utils import send_verification_email
 
 DEFAULT_FROM_EMAIL = "Django Test <automated@django.test.net>"
@@ -63,3 +78,230 @@ class FileBasedEmailBackendTest(TestCase):
         self.assertIn(user.email, email_content)
         self.assertIn(user.magic_link_url, email_content)
         self.assertIn(DEFAULT_FROM_EMAIL, email_content)
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; `drop` disconnects on the next send"""
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+        self.drop = False
+        self.error = None
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def sendmail(self, from_email, recipients, message):
+        if self.drop:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if self.error:
+            raise self.error
+        self.sent.append(recipients)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@override_settings(EMAIL_HOST="smtp.test", EMAIL_PORT=25, EMAIL_USE_TLS=False)
+class PooledSMTPEmailBackendTest(TestCase):
+    def setUp(self):
+        FakeSMTP.instances = []
+        backends._connections.clear()
+        self.addCleanup(backends._connections.clear)
+        patcher = mock.patch("smtplib.SMTP", FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def message(self, to="user@example.com"):
+        return EmailMessage("Subject", "Body", DEFAULT_FROM_EMAIL, [to])
+
+    def test_connection_is_reused_across_sends(self):
+        for _ in range(3):
+            backends.PooledSMTPEmailBackend().send_messages([self.message()])
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 3)
+        self.assertFalse(FakeSMTP.instances[0].closed)
+
+    def test_reconnects_when_server_hung_up(self):
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        FakeSMTP.instances[0].drop = True
+
+        sent = backends.PooledSMTPEmailBackend().send_messages([self.message()])
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertEqual(len(FakeSMTP.instances[1].sent), 1)
+
+    def test_refused_recipients_fail_only_that_message(self):
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        FakeSMTP.instances[0].error = smtplib.SMTPRecipientsRefused(
+            {"bounce@example.com": (550, b"No such user")}
+        )
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        FakeSMTP.instances[0].error = None
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 2)
+        self.assertFalse(FakeSMTP.instances[0].closed)
+
+    def test_connection_is_dropped_after_connection_errors(self):
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        FakeSMTP.instances[0].error = TimeoutError()
+
+        with self.assertRaises(TimeoutError):
+            backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(len(FakeSMTP.instances[1].sent), 1)
+
+    def test_fail_silently_still_drops_connection(self):
+        backends.PooledSMTPEmailBackend().send_messages([self.message()])
+        FakeSMTP.instances[0].error = TimeoutError()
+
+        sent = backends.PooledSMTPEmailBackend(fail_silently=True).send_messages(
+            [self.message()]
+        )
+
+        self.assertEqual(sent, 0)
+        self.assertNotIn(FakeSMTP.instances[0], backends._connections.values())
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_BATCH_WINDOW=0,
+)
+class QueueMessagesTest(TestCase):
+    def test_sends_immediately_without_batch_window(self):
+        message = EmailMessage("Subject", "Body", DEFAULT_FROM_EMAIL, ["a@b.test"])
+
+        queue_messages([message])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["a@b.test"])
+
+    def test_serialized_message_round_trips(self):
+        message = EmailMultiAlternatives(
+            "Subject", "Body", DEFAULT_FROM_EMAIL, ["a@b.test"]
+        )
+        message.attach_alternative("<p>Body</p>", "text/html")
+
+        copy = deserialize_message(serialize_message(message))
+
+        self.assertEqual(
+            (copy.subject, copy.body, copy.from_email, copy.to),
+            (message.subject, message.body, message.from_email, message.to),
+        )
+        self.assertEqual(copy.alternatives, [("<p>Body</p>", "text/html")])
+
+
+@override_settings(SITE_BASE_DOMAIN="https://app.example.com/")
+class RenderEmailTest(TestCase):
+    def test_renders_text_and_html_parts(self):
+        message = render_email(
+            "password_reset",
+            {"reset_url": "https://app.example.com/reset-password/abc?x=1&y=2"},
+            to=["a@b.test"],
+        )
+
+        self.assertEqual(message.subject, "Reset your password")
+        self.assertEqual(message.to, ["a@b.test"])
+        # Only the HTML part is escaped
+        self.assertIn("reset-password/abc?x=1&y=2\n", message.body)
+        ((html, mimetype),) = message.alternatives
+        self.assertEqual(mimetype, "text/html")
+        self.assertIn("reset-password/abc?x=1&amp;y=2", html)
+        self.assertIn('href="https://app.example.com"', html)
+
+    def test_optional_lines_are_left_out(self):
+        context = {"verify_url": "https://v", "base_url": "https://b"}
+
+        without_ip = render_email("verify_email", context, to=["a@b.test"])
+        with_ip = render_email(
+            "verify_email", {**context, "ip_address": "203.0.113.9"}, to=["a@b.test"]
+        )
+
+        self.assertIn("7 days.\n\nIn case", without_ip.body)
+        self.assertIn("originated from IP address 203.0.113.9\n", with_ip.body)
+
+    def test_static_fragments_are_rendered_once(self):
+        render_email("password_reset", {"reset_url": "https://r"}, to=["a@b.test"])
+
+        with mock.patch("mail.rendering.get_template") as get_template:
+            message = render_email(
+                "password_reset", {"reset_url": "https://r"}, to=["a@b.test"]
+            )
+
+        get_template.assert_not_called()
+        self.assertIn("app.example.com", message.alternatives[0][0])
+
+
+class FlushOutboxTest(TestCase):
+    def test_messages_returned_after_last_retry_get_a_new_flush(self):
+        message = serialize_message(
+            EmailMessage("Subject", "Body", DEFAULT_FROM_EMAIL, ["a@b.test"])
+        )
+        connection = mock.MagicMock()
+        connection.__enter__.return_value = connection
+        connection.send_messages.side_effect = smtplib.SMTPDataError(451, "Later")
+
+        with (
+            mock.patch("mail.tasks.get_connection", return_value=connection),
+            mock.patch("mail.outbox.take_batch", side_effect=[[message]]),
+            mock.patch("mail.outbox.return_batch") as return_batch,
+            mock.patch("mail.outbox.schedule_flush") as schedule_flush,
+        ):
+            result = flush_outbox.apply(retries=flush_outbox.max_retries)
+
+        self.assertIsInstance(result.result, smtplib.SMTPDataError)
+        return_batch.assert_called_once_with([message])
+        schedule_flush.assert_called_once_with(FAILED_FLUSH_DELAY)
+
+
+@unittest.skipUnless(os.environ.get("MAIL_BENCHMARKS"), "MAIL_BENCHMARKS not set")
+class RenderBenchmarks(TestCase):
+    """
+    Per-message render cost, e.g.:
+
+        MAIL_BENCHMARKS=1 python manage.py test mail.tests.RenderBenchmarks
+
+    MAIL_BENCHMARK_MESSAGES sets the number of messages rendered per email.
+    """
+
+    EMAILS = {
+        "verify_email": {
+            "verify_url": "https://app.example.com/verify-email/token",
+            "base_url": "https://app.example.com",
+            "ip_address": "203.0.113.9",
+        },
+        "password_reset": {"reset_url": "https://app.example.com/reset-password/token"},
+    }
+
+    def measure(self, name, context, clear_caches=False):
+        samples = []
+        for _ in range(int(os.environ.get("MAIL_BENCHMARK_MESSAGES", "1000"))):
+            if clear_caches:
+                rendering.clear_render_caches(setting="TEMPLATES")
+            start = time.perf_counter()
+            render_email(name, context, to=["bench@example.com"])
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    def test_render_cost(self):
+        for name, context in self.EMAILS.items():
+            cached = self.measure(name, context)
+            uncached = self.measure(name, context, clear_caches=True)
+            print(
+                f"\n{name}: {cached * 1e6:.0f}us per message "
+                f"({uncached * 1e6:.0f}us without render caches)"
+            )
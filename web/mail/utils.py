@@ -1,11 +1,7 @@
-from django.conf import settings
-from django.core.mail import send_mail
+from .rendering import render_email
 
 
 def send_verification_email(user):
-    subject = "Verify your account"
-    message = f"Follow this link to verify your account: {user.magic_link_url}"
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [user.email]
-
-    send_mail(subject, message, from_email, recipient_list)
+    render_email(
+        "magic_link", {"magic_link_url": user.magic_link_url}, to=[user.email]
+    ).send()
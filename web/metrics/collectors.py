@@ -3,8 +3,13 @@ Custom Prometheus metrics collectors.
 These metrics are automatically included in the /metrics endpoint.
 """
 
+import json
+import time
+
+from django.db import connections
 from django.urls import resolve
-from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 
 # Custom endpoint response time histogram
 endpoint_response_time = Histogram(
@@ -52,6 +57,181 @@ cache_operations_total = Counter(
     ["operation", "cache_key_prefix"],
 )
 
+# Stripe API client metrics
+stripe_requests_total = Counter(
+    "django_stripe_requests_total",
+    "Total Stripe API requests",
+    ["method", "outcome"],
+)
+
+stripe_request_duration = Histogram(
+    "django_stripe_request_seconds",
+    "Stripe API request duration",
+    ["method"],
+)
+
+stripe_circuit_state_gauge = Gauge(
+    "django_stripe_circuit_state",
+    "Stripe circuit breaker state (1 for the current state)",
+    ["state"],
+)
+
+stripe_pool_connections_gauge = Gauge(
+    "django_stripe_pool_connections",
+    "Connections in the Stripe HTTP pool",
+    ["kind"],
+)
+
+# Auth endpoint throttling
+auth_throttle_total = Counter(
+    "django_auth_throttle_total",
+    "Auth endpoint throttle decisions",
+    ["scope", "outcome"],
+)
+
+# Batched cleanup jobs
+cleanup_rows_deleted_total = Counter(
+    "django_cleanup_rows_deleted_total",
+    "Rows deleted by batched cleanup jobs",
+    ["job"],
+)
+
+cleanup_rows_per_second = Gauge(
+    "django_cleanup_rows_per_second",
+    "Delete throughput of the last cleanup batch",
+    ["job"],
+)
+
+
+class DatabasePoolCollector:
+    """
+    Exports psycopg connection pool stats at scrape time
+
+    Only pools that already exist in this process are reported; reading the
+    stats never opens a pool or a connection.
+    """
+
+    # psycopg_pool stat -> (metric name, help)
+    GAUGES = {
+        "pool_size": ("size", "Connections currently managed by the pool"),
+        "pool_available": ("available", "Idle connections in the pool"),
+        "requests_waiting": (
+            "requests_waiting",
+            "Requests currently waiting for a connection",
+        ),
+    }
+    COUNTERS = {
+        "requests_num": ("requests", "Connection requests served by the pool"),
+        "requests_queued": ("requests_queued", "Connection requests that waited"),
+        "requests_errors": (
+            "requests_errors",
+            "Connection requests that timed out or failed",
+        ),
+        "connections_num": ("connections", "Connections opened by the pool"),
+        "connections_lost": ("connections_lost", "Pooled connections found broken"),
+    }
+    # Reported by psycopg_pool in milliseconds
+    DURATIONS = {
+        "requests_wait_ms": (
+            "requests_wait_seconds",
+            "Total time requests waited for a connection",
+        ),
+        "usage_ms": ("usage_seconds", "Total time connections were checked out"),
+    }
+
+    def collect(self):
+        pools = {}
+        for alias in connections:
+            pools.update(getattr(type(connections[alias]), "_connection_pools", {}))
+        stats = {alias: pool.get_stats() for alias, pool in pools.items()}
+
+        for kind, family, scale in [
+            (self.GAUGES, GaugeMetricFamily, 1),
+            (self.COUNTERS, CounterMetricFamily, 1),
+            (self.DURATIONS, CounterMetricFamily, 1000),
+        ]:
+            for stat, (name, doc) in kind.items():
+                metric = family(f"django_db_pool_{name}", doc, labels=["alias"])
+                for alias, pool_stats in stats.items():
+                    metric.add_metric([alias], pool_stats.get(stat, 0) / scale)
+                yield metric
+
+
+class CeleryQueueCollector:
+    """
+    Exports Celery queue depth and the age of each queue's oldest message
+
+    Reads the Redis lists backing each queue (one per priority step) at scrape
+    time. Message age comes from the `published_at` header stamped in
+    `celeryapp.celery`.
+    """
+
+    def describe(self):
+        # Registering must not touch the broker
+        return self._families()
+
+    def collect(self):
+        from celeryapp.celery import app
+
+        depth, latency = self._families()
+        now = time.time()
+        try:
+            with app.pool.acquire(block=True, timeout=1) as connection:
+                connection.ensure_connection(max_retries=0, timeout=1)
+                channel = connection.default_channel
+                for queue in app.conf.task_queues:
+                    keys = {
+                        channel._q_for_pri(queue.name, pri)
+                        for pri in channel.priority_steps
+                    }
+                    pipe = channel.client.pipeline()
+                    for key in keys:
+                        pipe.llen(key)
+                        # Messages are LPUSHed and consumed from the right
+                        pipe.lindex(key, -1)
+                    results = pipe.execute()
+
+                    lengths, oldest = results[::2], results[1::2]
+                    published = [_published_at(message) for message in oldest]
+                    published = [ts for ts in published if ts is not None]
+
+                    depth.add_metric([queue.name], sum(lengths))
+                    latency.add_metric(
+                        [queue.name], now - min(published) if published else 0
+                    )
+        except Exception:
+            # An unreachable broker must not break the whole scrape
+            return []
+
+        return [depth, latency]
+
+    def _families(self):
+        return [
+            GaugeMetricFamily(
+                "celery_queue_length",
+                "Messages waiting in a Celery queue",
+                labels=["queue"],
+            ),
+            GaugeMetricFamily(
+                "celery_queue_latency_seconds",
+                "Age of the oldest message waiting in a Celery queue",
+                labels=["queue"],
+            ),
+        ]
+
+
+def _published_at(message):
+    if message is None:
+        return None
+    try:
+        return json.loads(message)["headers"].get("published_at")
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+REGISTRY.register(DatabasePoolCollector())
+REGISTRY.register(CeleryQueueCollector())
+
 
 def get_endpoint_name(request):
     """Extract endpoint name from Django request."""
@@ -84,3 +264,35 @@ def track_cache_operation(operation, key_prefix):
     cache_operations_total.labels(
         operation=operation, cache_key_prefix=key_prefix
     ).inc()
+
+
+def track_stripe_request(method, outcome, duration):
+    """Track a Stripe API request and its duration."""
+    stripe_requests_total.labels(method=method, outcome=outcome).inc()
+    stripe_request_duration.labels(method=method).observe(duration)
+
+
+def update_stripe_circuit_state(state):
+    """Update Stripe circuit breaker state gauge."""
+    for known_state in ("closed", "half_open", "open"):
+        stripe_circuit_state_gauge.labels(state=known_state).set(
+            1 if known_state == state else 0
+        )
+
+
+def update_stripe_pool_stats(idle, created):
+    """Update Stripe HTTP connection pool gauges."""
+    stripe_pool_connections_gauge.labels(kind="idle").set(idle)
+    stripe_pool_connections_gauge.labels(kind="created").set(created)
+
+
+def track_auth_throttle(scope, outcome):
+    """Track an auth throttle decision ("allowed" or "throttled")."""
+    auth_throttle_total.labels(scope=scope, outcome=outcome).inc()
+
+
+def track_cleanup_batch(job, rows, duration):
+    """Track a deleted cleanup batch and its throughput."""
+    cleanup_rows_deleted_total.labels(job=job).inc(rows)
+    if duration > 0:
+        cleanup_rows_per_second.labels(job=job).set(rows / duration)
@@ -73,6 +73,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Publishes tasks enqueued during the request once the view returns
+    "celeryapp.middleware.DeferredTaskMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -82,6 +84,13 @@ MIDDLEWARE = [
     "django_prometheus.middleware.PrometheusAfterMiddleware",
 ]
 
+# Web processes serve requests from many threads and share a psycopg 3
+# connection pool. Celery prefork children run one task at a time, so they set
+# DATABASE_POOL_MAX_SIZE=0 and keep one persistent connection instead.
+DATABASE_POOL_MIN_SIZE = config("DATABASE_POOL_MIN_SIZE", default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config("DATABASE_POOL_MAX_SIZE", default=10, cast=int)
+DATABASE_POOL_TIMEOUT = config("DATABASE_POOL_TIMEOUT", default=10, cast=int)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -90,9 +99,23 @@ DATABASES = {
         "PASSWORD": POSTGRES_PASSWORD,
         "HOST": config("POSTGRES_HOST", default="postgres"),
         "PORT": 5432,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+if DATABASE_POOL_MAX_SIZE:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": min(DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE),
+            "max_size": DATABASE_POOL_MAX_SIZE,
+            "timeout": DATABASE_POOL_TIMEOUT,
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DATABASE_CONN_MAX_AGE", default=600, cast=int
+    )
+
 USE_TZ = True
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -144,6 +167,20 @@ REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Proxies in front of Django that append to X-Forwarded-For (nginx)
+    "NUM_PROXIES": config("NUM_PROXIES", default=1, cast=int),
+    # Rates for authapi.throttling, keyed by "<view throttle_scope>_<kind>"
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "20/min",
+        "login_email": "10/min",
+        "login_global": "600/min",
+        "register_ip": "10/hour",
+        "register_global": "120/min",
+        "password_reset_ip": "10/hour",
+        "password_reset_email": "5/hour",
+        "resend_verification_ip": "10/hour",
+        "resend_verification_user": "5/hour",
+    },
 }
 
 TEMPLATES = [
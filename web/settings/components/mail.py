@@ -9,10 +9,12 @@ DEFAULT_FROM_EMAIL = "{{PROJECT_NAME}} <{{CONTACT_EMAIL}}>"
 if config("ENVIRONMENT", default=False) == "prod":
     # SendGrid
     EMAIL_HOST = config("EMAIL_HOST", "")  # smtp.sendgrid.net or smtp.gmail.com
-    EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    # Keeps one SMTP connection open per worker process
+    EMAIL_BACKEND = "mail.backends.PooledSMTPEmailBackend"
     EMAIL_HOST_USER = config("EMAIL_HOST_USER", "")  # SendGrid username or Gmail email
     EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", "")  # SG pass or Gmail app pass
     EMAIL_USE_TLS = True
+    EMAIL_TIMEOUT = 10
 
 else:
     logger.warning("mail module running in development mode.")
@@ -21,3 +23,12 @@ else:
     EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
     EMAIL_FILE_PATH = "/app/mail/dummy-mail/"
     EMAIL_USE_TLS = False
+
+# Emails queued within this many seconds are sent together by
+# mail.tasks.flush_outbox; 0 (the development default) sends each immediately
+EMAIL_BATCH_WINDOW = config(
+    "EMAIL_BATCH_WINDOW",
+    default=0.3 if config("ENVIRONMENT", default=False) == "prod" else 0,
+    cast=float,
+)
+EMAIL_BATCH_SIZE = config("EMAIL_BATCH_SIZE", default=100, cast=int)
@@ -2,3 +2,44 @@ import os
 
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD", "solsecretpassredis")
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
+
+# Per-process connection pool shared by every request thread
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+REDIS_CACHE_OPTIONS = {
+    "CLIENT_CLASS": "django_redis.client.DefaultClient",
+    "PASSWORD": REDIS_PASSWORD,
+    "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+    "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+    "CONNECTION_POOL_KWARGS": {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "retry_on_timeout": True,
+    },
+    # Fall back to the database instead of erroring if Redis is down
+    "IGNORE_EXCEPTIONS": True,
+}
+
+# Django cache (db 0 is the Celery broker, db 1 is redbeat)
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:6379/2",
+        "OPTIONS": REDIS_CACHE_OPTIONS,
+    },
+    # Kept apart from "default" so clearing the cache does not log users out
+    "sessions": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:6379/3",
+        "OPTIONS": REDIS_CACHE_OPTIONS,
+    },
+}
+
+# cached_db reads sessions from Redis and only falls through to Postgres on a
+# miss, so existing database sessions stay valid. Once
+# `manage.py copy_sessions_to_cache` has run, SESSION_ENGINE can be switched to
+# "django.contrib.sessions.backends.cache" to take session writes off Postgres.
+SESSION_ENGINE = os.environ.get(
+    "SESSION_ENGINE", "django.contrib.sessions.backends.cached_db"
+)
+SESSION_CACHE_ALIAS = "sessions"
@@ -5,6 +5,17 @@ STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY", "")
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
 
+# Shared Stripe HTTP client: timeouts (seconds), SDK retries, pool size and
+# circuit breaker (consecutive failures to open, seconds before a retrial)
+STRIPE_CONNECT_TIMEOUT = float(os.environ.get("STRIPE_CONNECT_TIMEOUT", "3"))
+STRIPE_READ_TIMEOUT = float(os.environ.get("STRIPE_READ_TIMEOUT", "10"))
+STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get("STRIPE_MAX_NETWORK_RETRIES", "2"))
+STRIPE_HTTP_POOL_SIZE = int(os.environ.get("STRIPE_HTTP_POOL_SIZE", "10"))
+STRIPE_BREAKER_FAILURE_THRESHOLD = int(
+    os.environ.get("STRIPE_BREAKER_FAILURE_THRESHOLD", "5")
+)
+STRIPE_BREAKER_RESET_TIMEOUT = int(os.environ.get("STRIPE_BREAKER_RESET_TIMEOUT", "30"))
+
 # Redirect URLs
 SITE_BASE = os.environ.get("NEXT_PUBLIC_SITE_BASE_DOMAIN", "http://localhost")
 STRIPE_SUCCESS_URL = f"{SITE_BASE}/dashboard?subscription=success"
@@ -16,3 +27,32 @@ STRIPE_TRIAL_DAYS = int(os.environ.get("STRIPE_TRIAL_DAYS", "14"))
 STRIPE_ALLOW_PROMO_CODES = (
     os.environ.get("STRIPE_ALLOW_PROMO_CODES", "True").lower() == "true"
 )
+
+# Upper bound (seconds) on how stale a cached subscription entitlement may be
+BILLING_ENTITLEMENT_CACHE_TTL = int(
+    os.environ.get("BILLING_ENTITLEMENT_CACHE_TTL", "300")
+)
+
+# Price/product catalog cache (shared Redis layer and per-process layer)
+BILLING_PRICE_CATALOG_TTL = int(
+    os.environ.get("BILLING_PRICE_CATALOG_TTL", str(60 * 60 * 24))
+)
+BILLING_PRICE_CATALOG_LOCAL_TTL = int(
+    os.environ.get("BILLING_PRICE_CATALOG_LOCAL_TTL", "60")
+)
+BILLING_PRICE_CATALOG_LOCAL_SIZE = int(
+    os.environ.get("BILLING_PRICE_CATALOG_LOCAL_SIZE", "256")
+)
+
+# Seconds to wait before syncing a subscription so that bursts of webhook
+# events for the same subscription collapse into a single Stripe sync
+BILLING_WEBHOOK_COALESCE_WINDOW = int(
+    os.environ.get("BILLING_WEBHOOK_COALESCE_WINDOW", "5")
+)
+
+# Bulk Stripe reconcile: subscriptions per bulk upsert, and how many `created`
+# windows are reconciled concurrently (keep within the Stripe read rate limit)
+BILLING_RECONCILE_CHUNK_SIZE = int(
+    os.environ.get("BILLING_RECONCILE_CHUNK_SIZE", "500")
+)
+BILLING_RECONCILE_SHARDS = int(os.environ.get("BILLING_RECONCILE_SHARDS", "4"))
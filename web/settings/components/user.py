@@ -1 +1,27 @@
+import os
+
 AUTH_USER_MODEL = "user.User"
+
+# Lifetime of the cached session auth hash used by /api/auth/validate/
+AUTH_SESSION_RECORD_TTL = int(os.environ.get("AUTH_SESSION_RECORD_TTL", "3600"))
+
+# Lifetime of the cached /api/auth/user/ profile
+AUTH_PROFILE_CACHE_TTL = int(os.environ.get("AUTH_PROFILE_CACHE_TTL", "3600"))
+
+# Django's default hashers, with PBKDF2 deriving keys in a process pool
+PASSWORD_HASHERS = [
+    "authapi.hashing.PooledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Processes in each web/worker process's hashing pool; 0 hashes inline
+PASSWORD_HASHING_WORKERS = int(
+    os.environ.get("PASSWORD_HASHING_WORKERS", str(os.cpu_count() or 1))
+)
+
+# Batched deletion of unverified accounts (authapi.cleanup)
+AUTH_CLEANUP_BATCH_SIZE = int(os.environ.get("AUTH_CLEANUP_BATCH_SIZE", "500"))
+AUTH_CLEANUP_TIME_BUDGET = int(os.environ.get("AUTH_CLEANUP_TIME_BUDGET", "240"))
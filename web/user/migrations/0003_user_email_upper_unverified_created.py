@@ -0,0 +1,29 @@
+# Generated by Django 5.1.9 on 2026-10-17 22:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0002_user_created_at_user_email_verified_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("email_verified", False)),
+                fields=["created_at", "id"],
+                name="user_unverified_created_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Upper("email"),
+                name="user_email_upper_uniq",
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from user.managers import UserManager
 
@@ -17,3 +18,17 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(default=timezone.now)
     groups = None
     user_permissions = None
+
+    class Meta:
+        constraints = [
+            # Backs email__iexact lookups (login, password reset, social login)
+            models.UniqueConstraint(Upper("email"), name="user_email_upper_uniq"),
+        ]
+        indexes = [
+            # Unverified-account cleanup walks (created_at, id) on this subset
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(email_verified=False),
+                name="user_unverified_created_idx",
+            ),
+        ]